@@ -1,10 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional, Dict, Any
 from datetime import datetime
+import socket
+import struct
 
-from .database import get_db
+from .database import get_db, get_async_db
 from .discovery import NetworkDiscovery
 from .models import DiscoveryRun, Router, Route, Network, TopologyLink, NetworkLink
 from .schemas import DiscoveryRequest, DiscoveryStatus, DiscoverySummary
@@ -36,17 +39,21 @@ current_discovery = None
 
 
 @router.get("/inventory")
-def get_inventory(db: Session = Depends(get_db)):
-    """Get all devices (similar to inventory endpoint)."""
+def get_inventory(snmp_enabled: Optional[bool] = None, db: Session = Depends(get_db)):
+    """Get all devices (similar to inventory endpoint).
+    
+    Pass snmp_enabled to have the database filter on it rather than the client.
+    """
     # Get all devices (routers and non-routers)
-    devices = db.query(Router).order_by(Router.created_at.desc()).all()
+    query = db.query(Router)
+    if snmp_enabled is not None:
+        query = query.filter(
+            Router.discovered_via == "snmp" if snmp_enabled else Router.discovered_via != "snmp"
+        )
+    devices = query.order_by(Router.created_at.desc()).all()
     
     inventory = []
     for device in devices:
-        # Get routes for this device to determine if it's a router
-        routes = db.query(Route).filter(Route.source_router_ip == device.ip_address).all()
-        networks = db.query(Network).filter(Network.router_ip == device.ip_address).all()
-        
         # Determine device type and role
         device_type = "router" if device.is_router else "unknown"
         network_role = "L3" if device.is_router else "Endpoint"
@@ -139,7 +146,10 @@ def walk_mib(ip_address: str, db: Session = Depends(get_db)):
 @router.get("/routers/{router_id}/routes")
 def get_router_routes(router_id: int, db: Session = Depends(get_db)):
     """Get routes for a specific router."""
-    routes = db.query(Route).filter(Route.router_id == router_id).all()
+    router = db.query(Router).options(selectinload(Router.routes)).filter(Router.id == router_id).first()
+    if not router:
+        raise HTTPException(status_code=404, detail="Router not found")
+    
     return [
         {
             "id": r.id,
@@ -147,9 +157,9 @@ def get_router_routes(router_id: int, db: Session = Depends(get_db)):
             "netmask": _cidr_to_netmask(r.destination.split('/')[1] if '/' in r.destination else "24"),  # Convert CIDR to netmask
             "next_hop": r.next_hop,
             "protocol": r.protocol,
-            "router_id": r.router_id
+            "router_id": router.id
         }
-        for r in routes
+        for r in router.routes
     ]
 
 
@@ -251,13 +261,7 @@ def _cidr_to_netmask(cidr_prefix: str) -> str:
         
         # Convert prefix to netmask
         mask = (0xffffffff >> (32 - prefix)) << (32 - prefix)
-        netmask_parts = [
-            str((mask >> 24) & 0xff),
-            str((mask >> 16) & 0xff),
-            str((mask >> 8) & 0xff),
-            str(mask & 0xff)
-        ]
-        return '.'.join(netmask_parts)
+        return socket.inet_ntoa(struct.pack('!I', mask & 0xffffffff))
     except Exception:
         return "255.255.255.0"  # Default fallback
 
@@ -270,8 +274,8 @@ def get_router_details(router_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Router not found")
     
     # Get route and network counts
-    routes_count = db.query(Route).filter(Route.router_id == router_id).count()
-    networks_count = db.query(Network).filter(Network.router_id == router_id).count()
+    routes_count = db.query(Route).filter(Route.source_router_ip == router.ip_address).count()
+    networks_count = db.query(Network).filter(Network.router_ip == router.ip_address).count()
     
     return {
         "id": router.id,
@@ -293,16 +297,19 @@ def get_router_details(router_id: int, db: Session = Depends(get_db)):
 @router.get("/routers/{router_id}/networks")
 def get_router_networks(router_id: int, db: Session = Depends(get_db)):
     """Get networks for a specific router."""
-    networks = db.query(Network).filter(Network.router_id == router_id).all()
+    router = db.query(Router).options(selectinload(Router.networks)).filter(Router.id == router_id).first()
+    if not router:
+        raise HTTPException(status_code=404, detail="Router not found")
+    
     return [
         {
             "id": n.id,
             "network": n.network,
             "interface": n.interface,
             "is_connected": n.is_connected,
-            "router_id": n.router_id
+            "router_id": router.id
         }
-        for n in networks
+        for n in router.networks
     ]
 
 
@@ -357,9 +364,9 @@ def start_discovery(request: DiscoveryRequest, db: Session = Depends(get_db)):
 
 
 @router.get("/discover/{run_id}", response_model=DiscoveryStatus)
-def get_discovery_status(run_id: int, db: Session = Depends(get_db)):
+async def get_discovery_status(run_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get discovery run status."""
-    run = db.query(DiscoveryRun).filter(DiscoveryRun.id == run_id).first()
+    run = await db.get(DiscoveryRun, run_id)
     if not run:
         raise ResourceNotFoundError(
             resource_type="Discovery Run",
@@ -471,22 +478,22 @@ def get_discovery_summary(run_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/discover")
-def list_discoveries(db: Session = Depends(get_db)):
+async def list_discoveries(db: AsyncSession = Depends(get_async_db)):
     """List all discovery runs."""
-    runs = db.query(DiscoveryRun).order_by(DiscoveryRun.started_at.desc()).all()
-    return [
-        {
-            "id": r.id,
-            "status": r.status,
-            "root_ip": r.root_ip,
-            "started_at": r.started_at,
-            "finished_at": r.finished_at,
-            "routers_found": r.routers_found,
-            "routes_found": r.routes_found,
-            "networks_found": r.networks_found
-        }
-        for r in runs
-    ]
+    # Plain column rows: the listing needs no ORM instances or identity map
+    result = await db.execute(
+        select(
+            DiscoveryRun.id,
+            DiscoveryRun.status,
+            DiscoveryRun.root_ip,
+            DiscoveryRun.started_at,
+            DiscoveryRun.finished_at,
+            DiscoveryRun.routers_found,
+            DiscoveryRun.routes_found,
+            DiscoveryRun.networks_found
+        ).order_by(DiscoveryRun.started_at.desc())
+    )
+    return [dict(row) for row in result.mappings()]
 
 
 @router.get("/routers")
@@ -768,249 +775,24 @@ def get_table_data(
         # Filter out meaningless default routes (0.0.0.0/0)
         query = query.filter(~Route.destination.like("0.0.0.0/%"))
         
-        # Get all routes first to deduplicate in Python
-        all_routes = query.all()
-        
-        # Deduplicate by destination network, keeping most recent
-        unique_routes = {}
-        for route in all_routes:
-            dest = route.destination
-            if dest not in unique_routes or route.created_at > unique_routes[dest].created_at:
-                unique_routes[dest] = route
-        
-        # Convert back to query-like result for pagination
-        routes_list = list(unique_routes.values())
-        total = len(routes_list)
-        
-        # Apply pagination after deduplication
-        records = routes_list[offset:offset + limit]
-        rows = [config["serializer"](record, db) for record in records]
-    else:
+        # Deduplicate by destination network in SQL, keeping the most recent route.
+        # row_number() rather than DISTINCT ON so this also works on SQLite.
+        ranked = query.with_entities(
+            Route.id,
+            func.row_number().over(
+                # id breaks created_at ties so the same row is kept on every request
+                partition_by=Route.destination, order_by=(Route.created_at.desc(), Route.id.desc())
+            ).label("rank"),
+        ).subquery()
+        query = (
+            db.query(Route)
+            .filter(Route.id.in_(select(ranked.c.id).where(ranked.c.rank == 1)))
+            .order_by(config["order_by"], Route.id.desc())
+        )
         total = query.count()
-        order_by = config.get("order_by")
-        if order_by is not None:
-            query = query.order_by(order_by)
-        records = query.offset(offset).limit(limit).all()
-        rows = [config["serializer"](record, db) for record in records]
-
-    return {
-        "table": table_key,
-        "columns": config["columns"],
-        "rows": rows,
-        "total": total,
-        "limit": limit,
-        "offset": offset,
-    }
-
-
-def _serialize_datetime(value: Optional[datetime]) -> Optional[str]:
-    return value.isoformat() if value else None
-
-
-TABLE_DEFINITIONS: Dict[str, Dict[str, Any]] = {
-    "discovery_runs": {
-        "columns": [
-            {"id": "id", "label": "Run ID", "type": "number"},
-            {"id": "root_ip", "label": "Root IP", "type": "text"},
-            {"id": "status", "label": "Status", "type": "badge"},
-            {"id": "routers_found", "label": "Routers", "type": "number"},
-            {"id": "routes_found", "label": "Routes", "type": "number"},
-            {"id": "networks_found", "label": "Networks", "type": "number"},
-            {"id": "started_at", "label": "Started", "type": "datetime"},
-            {"id": "finished_at", "label": "Finished", "type": "datetime"},
-        ],
-        "query": lambda db: db.query(DiscoveryRun),
-        "serializer": lambda run, db: {
-            "id": run.id,
-            "root_ip": run.root_ip,
-            "status": run.status,
-            "routers_found": run.routers_found,
-            "routes_found": run.routes_found,
-            "networks_found": run.networks_found,
-            "started_at": _serialize_datetime(run.started_at),
-            "finished_at": _serialize_datetime(run.finished_at),
-        },
-        "search_fields": [DiscoveryRun.root_ip, DiscoveryRun.status],
-        "order_by": DiscoveryRun.started_at.desc(),
-        "supports_run_filter": False,
-    },
-    "routers": {
-        "columns": [
-            {"id": "id", "label": "Router ID", "type": "number"},
-            {"id": "ip_address", "label": "IP Address", "type": "mono"},
-            {"id": "hostname", "label": "Hostname", "type": "text"},
-            {"id": "vendor", "label": "Vendor", "type": "badge"},
-            {"id": "model", "label": "Model", "type": "text"},
-            {"id": "discovered_via", "label": "Method", "type": "badge"},
-            {"id": "router_score", "label": "Score", "type": "number"},
-            {"id": "created_at", "label": "Discovered", "type": "datetime"},
-        ],
-        "query": lambda db: db.query(Router),
-        "serializer": lambda router, db: {
-            "id": router.id,
-            "ip_address": router.ip_address,
-            "hostname": router.hostname,
-            "vendor": router.vendor,
-            "model": router.model,
-            "discovered_via": router.discovered_via,
-            "router_score": router.router_score,
-            "created_at": _serialize_datetime(router.created_at),
-        },
-        "search_fields": [Router.ip_address, Router.hostname, Router.vendor, Router.model],
-        "order_by": Router.created_at.desc(),
-        "supports_run_filter": False,
-    },
-    "routes": {
-        "columns": [
-            {"id": "destination", "label": "Destination Network", "type": "mono"},
-            {"id": "source_router_ip", "label": "Source Router IP", "type": "mono"},
-            {"id": "next_hop_router_ip", "label": "Next Hop Router IP", "type": "mono"},
-            {"id": "protocol", "label": "Protocol", "type": "badge"},
-            {"id": "discovered_via", "label": "Method", "type": "badge"},
-            {"id": "created_at", "label": "Recorded", "type": "datetime"},
-        ],
-        "query": lambda db: db.query(Route),
-        "serializer": lambda route, db: {
-            "destination": route.destination,
-            "source_router_ip": route.source_router_ip,
-            "next_hop_router_ip": _get_next_hop_router_ip(db, route.next_hop),
-            "protocol": route.protocol,
-            "discovered_via": route.discovered_via,
-            "created_at": _serialize_datetime(route.created_at),
-        },
-        "search_fields": [Route.destination, Route.next_hop, Route.protocol],
-        "order_by": Route.created_at.desc(),
-        "supports_run_filter": False,
-    },
-    "networks": {
-        "columns": [
-            {"id": "network", "label": "Network", "type": "mono"},
-            {"id": "router_ip", "label": "Router IP", "type": "text"},
-            {"id": "interface", "label": "Interface", "type": "text"},
-            {"id": "is_connected", "label": "Connected", "type": "boolean"},
-            {"id": "created_at", "label": "Recorded", "type": "datetime"},
-        ],
-        "query": lambda db: db.query(Network),
-        "serializer": lambda network, db: {
-            "network": network.network,
-            "router_ip": network.router_ip,
-            "interface": network.interface,
-            "is_connected": network.is_connected,
-            "created_at": _serialize_datetime(network.created_at),
-        },
-        "search_fields": [Network.network, Network.interface],
-        "order_by": Network.created_at.desc(),
-        "supports_run_filter": False,
-    },
-    "topology_links": {
-        "columns": [
-            {"id": "id", "label": "Link ID", "type": "number"},
-            {"id": "discovery_run_id", "label": "Run", "type": "number"},
-            {"id": "from_router_id", "label": "From Router", "type": "number"},
-            {"id": "to_router_id", "label": "To Router", "type": "number"},
-            {"id": "shared_network", "label": "Network", "type": "mono"},
-            {"id": "link_type", "label": "Type", "type": "badge"},
-            {"id": "created_at", "label": "Recorded", "type": "datetime"},
-        ],
-        "query": lambda db: db.query(TopologyLink),
-        "serializer": lambda link, db: {
-            "id": link.id,
-            "discovery_run_id": link.discovery_run_id,
-            "from_router_id": link.from_router_id,
-            "to_router_id": link.to_router_id,
-            "shared_network": link.shared_network,
-            "link_type": link.link_type,
-            "created_at": _serialize_datetime(link.created_at),
-        },
-        "search_fields": [TopologyLink.shared_network, TopologyLink.link_type],
-        "order_by": TopologyLink.created_at.desc(),
-        "supports_run_filter": True,
-        "run_column": TopologyLink.discovery_run_id,
-    },
-    "network_links": {
-        "columns": [
-            {"id": "id", "label": "Link ID", "type": "text"},
-            {"id": "from_router_id", "label": "From Router", "type": "number"},
-            {"id": "to_router_id", "label": "To Router", "type": "number"},
-            {"id": "from_ip", "label": "From IP", "type": "mono"},
-            {"id": "to_ip", "label": "To IP", "type": "mono"},
-            {"id": "discovery_method", "label": "Method", "type": "badge"},
-            {"id": "latency_ms", "label": "Latency (ms)", "type": "number"},
-            {"id": "hop_count", "label": "Hops", "type": "number"},
-            {"id": "status", "label": "Status", "type": "badge"},
-            {"id": "last_verified", "label": "Last Verified", "type": "datetime"},
-        ],
-        "query": lambda db: db.query(NetworkLink),
-        "serializer": lambda link, db: {
-            "id": link.id,
-            "from_router_id": link.from_router_id,
-            "to_router_id": link.to_router_id,
-            "from_ip": link.from_ip,
-            "to_ip": link.to_ip,
-            "discovery_method": link.discovery_method,
-            "latency_ms": link.latency_ms,
-            "hop_count": link.hop_count,
-            "status": link.status,
-            "last_verified": _serialize_datetime(link.last_verified),
-        },
-        "search_fields": [NetworkLink.from_ip, NetworkLink.to_ip, NetworkLink.discovery_method, NetworkLink.status],
-        "order_by": NetworkLink.last_verified.desc(),
-        "supports_run_filter": False,
-    },
-}
-
-
-@router.get("/tables")
-def get_table_data(
-    table: str,
-    run_id: Optional[int] = None,
-    search: Optional[str] = None,
-    limit: int = 100,
-    offset: int = 0,
-    db: Session = Depends(get_db),
-):
-    table_key = table.lower()
-    if table_key not in TABLE_DEFINITIONS:
-        raise HTTPException(status_code=400, detail="Unsupported table")
-    config = TABLE_DEFINITIONS[table_key]
-
-    limit = max(10, min(limit, 500))
-    offset = max(offset, 0)
-
-    query = config["query"](db)
-
-    if run_id is not None and config.get("supports_run_filter"):
-        run_column = config.get("run_column")
-        if run_column is not None:
-            query = query.filter(run_column == run_id)
-
-    if search:
-        search_fields = config.get("search_fields", [])
-        clauses = [field.ilike(f"%{search}%") for field in search_fields]
-        if clauses:
-            query = query.filter(or_(*clauses))
-
-    # Special handling for routes: filter out default routes and deduplicate
-    if table_key == "routes":
-        # Filter out meaningless default routes (0.0.0.0/0)
-        query = query.filter(~Route.destination.like("0.0.0.0/%"))
-        
-        # Get all routes first to deduplicate in Python
-        all_routes = query.all()
-        
-        # Deduplicate by destination network, keeping most recent
-        unique_routes = {}
-        for route in all_routes:
-            dest = route.destination
-            if dest not in unique_routes or route.created_at > unique_routes[dest].created_at:
-                unique_routes[dest] = route
-        
-        # Convert back to query-like result for pagination
-        routes_list = list(unique_routes.values())
-        total = len(routes_list)
         
-        # Apply pagination after deduplication
-        records = routes_list[offset:offset + limit]
+        # Paginate the deduplicated rows in the database as well
+        records = query.offset(offset).limit(limit).all()
         rows = [config["serializer"](record, db) for record in records]
     else:
         total = query.count()
@@ -1104,40 +886,58 @@ def save_network_links_batch(links_data: List[dict], db: Session = Depends(get_d
     """Save multiple network links in a batch."""
     try:
         saved_links = []
+        now = datetime.utcnow()
+        # Look up every link in the batch at once instead of one SELECT per link;
+        # only the verification count is needed to build the updates
+        verification_counts = dict(
+            db.query(NetworkLink.id, NetworkLink.verification_count).filter(
+                NetworkLink.id.in_([link_data['id'] for link_data in links_data])
+            )
+        )
+        # Rows are written below with bulk mappings, not tracked as ORM objects
+        new_links = {}
+        updated_links = {}
         for link_data in links_data:
-            # Check if link already exists
-            existing_link = db.query(NetworkLink).filter(NetworkLink.id == link_data['id']).first()
+            link_id = link_data['id']
+            link = new_links.get(link_id) or updated_links.get(link_id)
+            if link is None and link_id in verification_counts:
+                link = updated_links[link_id] = {'id': link_id, 'verification_count': verification_counts[link_id]}
             
-            if existing_link:
+            if link is not None:
                 # Update existing link
-                existing_link.last_verified = datetime.utcnow()
-                existing_link.verification_count += 1
+                link['last_verified'] = now
+                link['verification_count'] += 1
                 if 'latency_ms' in link_data:
-                    existing_link.latency_ms = link_data['latency_ms']
+                    link['latency_ms'] = link_data['latency_ms']
                 if 'hop_count' in link_data:
-                    existing_link.hop_count = link_data['hop_count']
-                existing_link.updated_at = datetime.utcnow()
-                saved_links.append({"id": existing_link.id, "action": "updated"})
+                    link['hop_count'] = link_data['hop_count']
+                link['updated_at'] = now
+                saved_links.append({"id": link_id, "action": "updated"})
             else:
                 # Create new link
-                new_link = NetworkLink(
-                    id=link_data['id'],
-                    from_router_id=link_data['from_router_id'],
-                    to_router_id=link_data['to_router_id'],
-                    from_ip=link_data['from_ip'],
-                    to_ip=link_data['to_ip'],
-                    discovery_method=link_data['discovery_method'],
-                    initial_discovery=datetime.utcnow(),
-                    last_verified=datetime.utcnow(),
-                    verification_count=1,
-                    latency_ms=link_data.get('latency_ms'),
-                    hop_count=link_data.get('hop_count'),
-                    color=link_data.get('color'),
-                    width=link_data.get('width', 2)
-                )
-                db.add(new_link)
-                saved_links.append({"id": new_link.id, "action": "created"})
+                new_links[link_id] = {
+                    'id': link_id,
+                    'from_router_id': link_data['from_router_id'],
+                    'to_router_id': link_data['to_router_id'],
+                    'from_ip': link_data['from_ip'],
+                    'to_ip': link_data['to_ip'],
+                    'discovery_method': link_data['discovery_method'],
+                    'initial_discovery': now,
+                    'last_verified': now,
+                    'verification_count': 1,
+                    'latency_ms': link_data.get('latency_ms'),
+                    'hop_count': link_data.get('hop_count'),
+                    'color': link_data.get('color'),
+                    'width': link_data.get('width', 2),
+                    'created_at': now,
+                    'updated_at': now
+                }
+                saved_links.append({"id": link_id, "action": "created"})
         
+        if new_links:
+            db.bulk_insert_mappings(NetworkLink, list(new_links.values()))
+        if updated_links:
+            db.bulk_update_mappings(NetworkLink, list(updated_links.values()))
         db.commit()
         return {"message": f"Saved {len(saved_links)} links", "results": saved_links}
     except Exception as e:
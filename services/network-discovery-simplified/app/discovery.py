@@ -1,27 +1,206 @@
+import io
 import logging
+import os
 import paramiko
+import socket
+import struct
 import subprocess
 import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from functools import lru_cache
 from typing import List, Dict, Optional, Set, Tuple
-from ipaddress import IPv4Address, IPv4Network, ip_network
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 from datetime import datetime
 
 from .models import DiscoveryRun, Router, Route, Network, TopologyLink
-from .snmp_simple import SimpleSnmpClient
+from .snmp_simple import snmp_client
 from .types import SystemInfo, RouteEntry
 from .vendors import vendor_factory
 
 logger = logging.getLogger(__name__)
 
+# sysDescr vendor names
+KNOWN_VENDORS = ('cisco', 'juniper', 'arista', 'ubiquiti', 'mikrotik', 'fortinet')
+_KNOWN_VENDORS_RE = re.compile('|'.join(KNOWN_VENDORS), re.IGNORECASE)
+
+# IANA enterprise number (1.3.6.1.4.1.<N> in sysObjectID) to vendor
+ENTERPRISE_OID_PREFIX = '1.3.6.1.4.1.'
+_ENTERPRISE_VENDORS = {
+    9: 'Cisco',
+    11: 'HP',
+    674: 'Dell',
+    2636: 'Juniper',
+    12356: 'Fortinet',
+    14988: 'Mikrotik',
+    20992: 'Cradlepoint',
+    30065: 'Arista',
+    41112: 'Ubiquiti',
+}
+
+# sysDescr model patterns (Cisco), checked in order
+_MODEL_PATTERNS = tuple(re.compile(p) for p in (
+    r'(ISR \d+)',
+    r'(ASR \d+)',
+    r'(Catalyst \d+)',
+    r'(\d+系列)',
+))
+
+# (network, netmask) as packed ints: 10.0.0.0/8, 172.16.0.0/12, 192.168.0.0/16
+# and 169.254.0.0/16 (link-local)
+_PRIVATE_NETWORKS = (
+    (0x0A000000, 0xFF000000),
+    (0xAC100000, 0xFFF00000),
+    (0xC0A80000, 0xFFFF0000),
+    (0xA9FE0000, 0xFFFF0000),
+)
+# Every range above is /8 or longer, so its first octet is fixed; an address with
+# any other first octet is rejected without being parsed
+_PRIVATE_FIRST_OCTETS = frozenset(str(network >> 24) for network, _ in _PRIVATE_NETWORKS)
+
+# SSH key exchange order: fast elliptic-curve/SHA-2 exchanges first, then the
+# legacy SHA-1 Diffie-Hellman groups that older Cisco ASA firmware still requires
+SSH_PREFERRED_KEX = (
+    'curve25519-sha256@libssh.org',
+    'ecdh-sha2-nistp256',
+    'diffie-hellman-group14-sha256',
+    'diffie-hellman-group14-sha1',
+    'diffie-hellman-group-exchange-sha1',
+    'diffie-hellman-group1-sha1'
+)
+
+# For older Cisco ASA, we need to enable the old key exchange algorithms.
+# This is process-wide paramiko state, so it is set once here rather than per connection.
+paramiko.Transport._preferred_kex = SSH_PREFERRED_KEX
+
+# Default set of CLI commands for generic devices, in the order they are tried
+DEFAULT_CLI_COMMANDS = (
+    "show ip route",           # Standard Cisco
+    "show route",              # Generic
+    "show ip route static",    # Static routes only
+    "show ip route connected", # Connected routes only  
+    "get route info",          # Some edge routers
+    "ip route show",           # Linux-style
+    # L3 Switch specific commands
+    "show routing-table",      # Some L3 switches
+    "show ip route summary",   # Route summary
+    "display ip routing-table", # Huawei/H3C style
+    # ASA-specific commands for NAT/VPN tunnels
+    "show crypto map",         # VPN tunnel information
+    "show nat",                # NAT translations
+    "show run | include tunnel", # Tunnel configurations
+    "show run | include nat",   # NAT configurations
+    "show vpn-sessiondb",      # Active VPN sessions
+    "show crypto ipsec sa",    # IPSec security associations
+    "show access-list",        # ACLs that might reveal networks
+)
+
+# Seconds one SSH route command may run, and the budget for the whole fallback
+# command list on one device, so slow commands can't add up across the list
+SSH_COMMAND_TIMEOUT = 30
+SSH_ROUTE_BUDGET = 90
+
+# Loopback, link-local, unspecified, multicast and broadcast hops are never routers
+_SKIP_HOP_PREFIXES = ('127.', '169.254.', '0.', '224.', '255.')
+
+# Concurrent device collection per BFS level, traceroutes and SNMP probes.
+# Probes block on SNMP/SSH/ping I/O rather than the GIL, so this bounds how
+# many devices are worked on at once, not CPU use.
+PROBE_WORKERS = int(os.getenv('PROBE_WORKERS', '16'))
+
+# One pool for the whole process: threads are reused across BFS levels,
+# discovery phases and runs, and concurrent runs share the same bound
+_probe_executor = ThreadPoolExecutor(max_workers=PROBE_WORKERS, thread_name_prefix='discovery-probe')
+
+# New-route batches at least this large are loaded with COPY on PostgreSQL;
+# core routers can carry full tables of thousands of routes
+ROUTE_COPY_THRESHOLD = 500
+ROUTE_COPY_COLUMNS = ('source_router_ip', 'destination', 'next_hop', 'protocol', 'discovered_via', 'created_at')
+
+@lru_cache(maxsize=4096)
+def _parse_vendor_model(sys_descr: str, sys_object_id: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """Return (vendor, model) parsed from sysDescr, falling back to the
+    sysObjectID enterprise number for the vendor.
+
+    Most of a fleet reports the same few sysDescr strings, so results are
+    cached rather than re-scanned for every device on every run.
+    """
+    match = _KNOWN_VENDORS_RE.search(sys_descr)
+    vendor = match.group(0).capitalize() if match else None
+    if not vendor and sys_object_id and sys_object_id.startswith(ENTERPRISE_OID_PREFIX):
+        enterprise = sys_object_id[len(ENTERPRISE_OID_PREFIX):].partition('.')[0]
+        if enterprise.isdigit():
+            vendor = _ENTERPRISE_VENDORS.get(int(enterprise))
+
+    # Simple pattern matching for common models
+    model = None
+    for pattern in _MODEL_PATTERNS:
+        match = pattern.search(sys_descr)
+        if match:
+            model = match.group(1)
+            break
+
+    return vendor, model
+
+
+def _ipv4_to_int(address: str) -> int:
+    """Parse a dotted-quad IPv4 address into an int.
+    
+    inet_aton alone also takes short ("10.1"), hex and leading-zero forms,
+    which ipaddress rejects; require four plain decimal octets as it does.
+    """
+    octets = address.split('.')
+    if len(octets) != 4 or any(
+        not octet.isdigit() or not octet.isascii() or (len(octet) > 1 and octet[0] == '0')
+        for octet in octets
+    ):
+        raise ValueError(f"Invalid IPv4 address: {address!r}")
+    return struct.unpack('!I', socket.inet_aton(address))[0]
+
+
+@lru_cache(maxsize=4096)
+def _pack_network(ip: str, netmask: str) -> int:
+    """Pack the network address and prefix length of ip/netmask into one int."""
+    ip_int = _ipv4_to_int(ip)
+    mask_int = _ipv4_to_int(netmask)
+    host_bits = ~mask_int & 0xFFFFFFFF
+    if host_bits & (host_bits + 1):
+        raise ValueError(f"Non-contiguous netmask: {netmask}")
+    return (ip_int & mask_int) | (mask_int.bit_count() << 32)
+
+
+def _format_network(packed: int) -> str:
+    """Format a packed network from _pack_network as CIDR notation."""
+    return f"{socket.inet_ntoa(struct.pack('!I', packed & 0xFFFFFFFF))}/{packed >> 32}"
+
+
+@lru_cache(maxsize=65536)
+def _network_cidr(ip: str, netmask: str) -> Optional[str]:
+    """CIDR notation of the network ip/netmask is in, or None if either is invalid.
+    
+    Cached: every route and interface of a device goes through this on each save,
+    and the same destinations recur across devices and runs.
+    """
+    try:
+        return _format_network(_pack_network(ip, netmask))
+    except Exception:
+        return None
+
 
 class NetworkDiscovery:
     """Simplified network discovery service with SSH/CLI and SNMP support."""
     
     def __init__(self, db_session: Session):
         self.db = db_session
-        self.snmp_client = SimpleSnmpClient(timeout=5, retries=2)
+        self.snmp_client = snmp_client
         self.vendor_factory = vendor_factory
+        # Router IP -> fingerprint of the routes and networks this run last
+        # committed for it. Kept per run (one instance per discovery), so rows
+        # deleted or written elsewhere between runs are re-checked against the
+        # database on the next run.
+        self._saved_fingerprints: Dict[str, int] = {}
     
     def start_discovery(self, root_ip: str, snmp_community: str = 'public', 
                        ssh_credentials: Optional[Dict[str, str]] = None) -> int:
@@ -69,168 +248,217 @@ class NetworkDiscovery:
     
     def _discover_network_bfs(self, root_ip: str, snmp_community: str, 
                              ssh_credentials: Optional[Dict[str, str]], run_id: int) -> List[str]:
-        """Discover network using optimized BFS from root IP - SNMP-first approach."""
-        queue = [root_ip]
-        visited = set()
+        """Discover network using optimized BFS from root IP - SNMP-first approach.
+        
+        Devices are queried concurrently, and each next hop is queued as soon as the
+        device that revealed it is saved rather than when its whole BFS level has
+        finished, so one slow device doesn't hold up the rest. Results are saved
+        serially on this thread since the DB session is not thread safe.
+        """
+        visited = {root_ip}
         discovered_routers = []
         
-        while queue:
-            current_ip = queue.pop(0)
-            if current_ip in visited:
-                continue
+        def collect(ip: str):
+            return _probe_executor.submit(self._collect_device, ip, snmp_community, ssh_credentials)
+        
+        pending = {collect(root_ip): root_ip}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                current_ip = pending.pop(future)
+                result = future.result()
+                if result is None:
+                    continue
+                system_info, routes, interfaces, discovery_method = result
                 
-            visited.add(current_ip)
-            logger.info(f"Processing {current_ip}")
-            
-            # Try to discover routes from this device
-            routes = []
-            system_info = None
-            interfaces = []
-            discovery_method = 'snmp'
+                # If we found routes or interfaces, save the device
+                if routes or interfaces or system_info:
+                    router = self._save_router(current_ip, system_info, routes, interfaces, discovery_method, run_id)
+                    if router:
+                        discovered_routers.append(current_ip)
+                        
+                        # Extract next hops and add to queue for BFS expansion
+                        next_hops = set()
+                        for route in routes:
+                            if route.next_hop and route.next_hop != '0.0.0.0':
+                                next_hops.add(route.next_hop)
+                        
+                        # Also extract network IPs for edge discovery
+                        for interface in interfaces:
+                            if hasattr(interface, 'ip_address') and interface.ip_address:
+                                next_hops.add(interface.ip_address)
+                        
+                        for next_hop in next_hops:
+                            if next_hop not in visited:
+                                visited.add(next_hop)
+                                pending[collect(next_hop)] = next_hop
+                                logger.info(f"  Added next hop to queue: {next_hop}")
+                else:
+                    logger.info(f"  No discovery data for {current_ip}, skipping")
+        
+        return discovered_routers
+    
+    def _collect_device(self, current_ip: str, snmp_community: str,
+                        ssh_credentials: Optional[Dict[str, str]]):
+        """Collect system info, routes and interfaces for one device. Does not touch the DB.
+        
+        Returns (system_info, routes, interfaces, discovery_method), or None to skip the device.
+        """
+        logger.info(f"Processing {current_ip}")
+        
+        # Try to discover routes from this device
+        routes = []
+        system_info = None
+        interfaces = []
+        discovery_method = 'snmp'
+        
+        # OPTIMIZED: Try SNMP first with fast timeout
+        try:
+            logger.info(f"  Trying SNMP discovery for {current_ip}")
+            system_info = self.snmp_client.get_system_info(current_ip, snmp_community)
+            if system_info is None:
+                # The table walks would each wait out the same timeout, so fall
+                # through to SSH (or skip) as soon as the system GET gets no answer
+                raise ValueError(f"No SNMP response from {current_ip}")
+            snmp_routes, interfaces = self.snmp_client.get_routes_and_interfaces(current_ip, snmp_community)
+            logger.info(f"  SNMP discovery SUCCESS: {len(snmp_routes)} routes, {len(interfaces)} interfaces")
             
-            # OPTIMIZED: Try SNMP first with fast timeout
-            try:
-                logger.info(f"  Trying SNMP discovery for {current_ip}")
-                system_info = self.snmp_client.get_system_info(current_ip, snmp_community)
-                snmp_routes = self.snmp_client.get_routes(current_ip, snmp_community)
-                interfaces = self.snmp_client.get_interfaces(current_ip, snmp_community)
-                logger.info(f"  SNMP discovery SUCCESS: {len(snmp_routes)} routes, {len(interfaces)} interfaces")
-                
-                # Always try SSH if we have credentials to get full routing tables with next hops
-                if ssh_credentials:
-                    logger.info(f"  Trying SSH for full routing table with next hops...")
-                    try:
-                        ssh_routes = self._get_routes_ssh_optimized(current_ip, ssh_credentials, system_info)
-                        if ssh_routes and len(ssh_routes) > len(snmp_routes):
-                            logger.info(f"  SSH found more detailed routes: {len(ssh_routes)} vs SNMP {len(snmp_routes)}")
-                            routes = ssh_routes
-                            discovery_method = 'cli'
-                        else:
-                            routes = snmp_routes
-                            logger.info(f"  Using SNMP routes: {len(routes)}")
-                    except Exception as ssh_e:
-                        logger.warning(f"  SSH failed, using SNMP routes: {ssh_e}")
+            # Always try SSH if we have credentials to get full routing tables with next hops
+            if ssh_credentials:
+                logger.info(f"  Trying SSH for full routing table with next hops...")
+                try:
+                    ssh_routes = self._get_routes_ssh_optimized(current_ip, ssh_credentials, system_info)
+                    if ssh_routes and len(ssh_routes) > len(snmp_routes):
+                        logger.info(f"  SSH found more detailed routes: {len(ssh_routes)} vs SNMP {len(snmp_routes)}")
+                        routes = ssh_routes
+                        discovery_method = 'cli'
+                    else:
                         routes = snmp_routes
-                else:
+                        logger.info(f"  Using SNMP routes: {len(routes)}")
+                except Exception as ssh_e:
+                    logger.warning(f"  SSH failed, using SNMP routes: {ssh_e}")
                     routes = snmp_routes
-                    logger.info(f"  No SSH credentials, using SNMP routes only")
-                
-            except Exception as snmp_e:
-                logger.info(f"  SNMP failed: {snmp_e}")
-                
-                # Try SSH if SNMP failed and we have credentials
-                if ssh_credentials:
-                    logger.info(f"  SNMP failed, trying SSH discovery")
-                    discovery_method = 'cli'
-                    try:
-                        # Attempt to gather minimal system info over SSH to help vendor detection
-                        system_info_cli = self._get_system_info_ssh(current_ip, ssh_credentials)
-                        system_info = system_info or system_info_cli
-                        ssh_routes = self._get_routes_ssh_optimized(current_ip, ssh_credentials, system_info)
-                        if ssh_routes:
-                            routes = ssh_routes
-                            logger.info(f"  SSH discovery found {len(routes)} routes")
-                    except Exception as ssh_e:
-                        logger.warning(f"  SSH also failed: {ssh_e}")
-                        continue  # Skip this device and move to next
-                else:
-                    logger.info(f"  No SSH credentials, skipping {current_ip}")
-                    continue
+            else:
+                routes = snmp_routes
+                logger.info(f"  No SSH credentials, using SNMP routes only")
             
-            # If we found routes or interfaces, save the device
-            if routes or interfaces or system_info:
-                router = self._save_router(current_ip, system_info, routes, interfaces, discovery_method, run_id)
-                if router:
-                    discovered_routers.append(current_ip)
-                    
-                    # Extract next hops and add to queue for BFS expansion
-                    next_hops = set()
-                    for route in routes:
-                        if route.next_hop and route.next_hop != '0.0.0.0':
-                            next_hops.add(route.next_hop)
-                    
-                    # Also extract network IPs for edge discovery
-                    for interface in interfaces:
-                        if hasattr(interface, 'ip_address') and interface.ip_address:
-                            next_hops.add(interface.ip_address)
+        except Exception as snmp_e:
+            logger.info(f"  SNMP failed: {snmp_e}")
+            
+            # Try SSH if SNMP failed and we have credentials
+            if ssh_credentials:
+                logger.info(f"  SNMP failed, trying SSH discovery")
+                discovery_method = 'cli'
+                # Share one session between the system info and route commands
+                ssh_client = None
+                try:
+                    try:
+                        ssh_client = self._connect_ssh_optimized(current_ip, ssh_credentials)
+                    except Exception as connect_e:
+                        logger.warning(f"  SSH connect failed: {connect_e}")
                     
-                    for next_hop in next_hops:
-                        if next_hop not in visited:
-                            queue.append(next_hop)
-                            logger.info(f"  Added next hop to queue: {next_hop}")
+                    # Attempt to gather minimal system info over SSH to help vendor detection
+                    system_info_cli = self._get_system_info_ssh(current_ip, ssh_credentials, ssh_client)
+                    system_info = system_info or system_info_cli
+                    ssh_routes = self._get_routes_ssh_optimized(current_ip, ssh_credentials, system_info, ssh_client)
+                    if ssh_routes:
+                        routes = ssh_routes
+                        logger.info(f"  SSH discovery found {len(routes)} routes")
+                except Exception as ssh_e:
+                    logger.warning(f"  SSH also failed: {ssh_e}")
+                    return None  # Skip this device and move to next
+                finally:
+                    if ssh_client:
+                        ssh_client.close()
             else:
-                logger.info(f"  No discovery data for {current_ip}, skipping")
+                logger.info(f"  No SSH credentials, skipping {current_ip}")
+                return None
         
-        return discovered_routers
+        return system_info, routes, interfaces, discovery_method
     
-    def _get_routes_ssh_optimized(self, ip: str, credentials: Dict[str, str], system_info: Optional[SystemInfo] = None) -> List[Route]:
-        """Optimized SSH route discovery with faster timeouts and edge router focus."""
+    def _get_routes_ssh_optimized(self, ip: str, credentials: Dict[str, str], system_info: Optional[SystemInfo] = None,
+                                  ssh_client: Optional[paramiko.SSHClient] = None) -> List[Route]:
+        """Optimized SSH route discovery with faster timeouts and edge router focus.
+        
+        Runs over ssh_client when given; the caller keeps ownership of it.
+        """
         routes = []
         
         commands = self._get_cli_command_list(system_info)
         
-        for command in commands:
-            try:
-                logger.info(f"  Executing optimized SSH command: {command}")
-                
-                # Use faster SSH connection with shorter timeout for edge routers
-                client = paramiko.SSHClient()
-                client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-                
-                # For older Cisco ASA, we need to enable the old key exchange algorithms
-                paramiko.Transport._preferred_kex = (
-                    'diffie-hellman-group14-sha1',
-                    'diffie-hellman-group-exchange-sha1',
-                    'diffie-hellman-group1-sha1'
-                )
-                
-                client.connect(
-                    ip,
-                    username=credentials['username'],
-                    password=credentials['password'],
-                    timeout=10,  # Faster timeout: 10 seconds instead of 15
-                    banner_timeout=10,
-                    auth_timeout=10,
-                    look_for_keys=False,
-                    allow_agent=False
-                )
-                
-                stdin, stdout, stderr = client.exec_command(command, timeout=30)  # 30 sec timeout instead of 60
-                
-                output = stdout.read().decode('utf-8', errors='ignore')
-                error_output = stderr.read().decode('utf-8', errors='ignore')
-                
-                if error_output and not error_output.strip().startswith('%'):
-                    logger.warning(f"  SSH command stderr: {error_output}")
-                
-                logger.info(f"  SSH command output ({len(output)} chars): {output[:1000]}...")
-                
-                parsed_routes: List[RouteEntry] = []
-                if system_info and self.vendor_factory:
-                    parsed_routes = self.vendor_factory.auto_parse_routes(output, command, system_info)
+        # One SSH session is reused for all commands; it is only re-opened if the
+        # device drops it between commands
+        client = ssh_client
+        deadline = time.monotonic() + SSH_ROUTE_BUDGET
+        try:
+            for command in commands:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.warning(f"  SSH route budget of {SSH_ROUTE_BUDGET}s spent on {ip}, skipping remaining commands")
+                    break
+                try:
+                    logger.info(f"  Executing optimized SSH command: {command}")
+                    
+                    transport = client.get_transport() if client else None
+                    if not transport or not transport.is_active():
+                        if client:
+                            client.close()
+                        client = self._connect_ssh_optimized(ip, credentials)
+                    
+                    stdin, stdout, stderr = client.exec_command(command, timeout=min(SSH_COMMAND_TIMEOUT, remaining))
+                    
+                    output = stdout.read().decode('utf-8', errors='ignore')
+                    error_output = stderr.read().decode('utf-8', errors='ignore')
+                    
+                    if error_output and not error_output.strip().startswith('%'):
+                        logger.warning(f"  SSH command stderr: {error_output}")
+                    
+                    logger.debug("  SSH command output (%d chars): %s...", len(output), output[:1000])
+                    
+                    parsed_routes: List[RouteEntry] = []
+                    if system_info and self.vendor_factory:
+                        parsed_routes = self.vendor_factory.auto_parse_routes(output, command, system_info)
 
-                if not parsed_routes:
-                    parsed_routes = self._parse_routes_from_output(output, command)
+                    if not parsed_routes:
+                        parsed_routes = self._parse_routes_from_output(output, command)
 
-                if parsed_routes:
-                    routes.extend(parsed_routes)
-                
-                if routes:  # Found routes, don't try more commands
-                    logger.info(f"  Found {len(routes)} routes with optimized SSH, stopping")
-                    break
+                    if parsed_routes:
+                        routes.extend(parsed_routes)
+                    
+                    if routes:  # Found routes, don't try more commands
+                        logger.info(f"  Found {len(routes)} routes with optimized SSH, stopping")
+                        break
                     
+                except Exception as cmd_e:
+                    logger.warning(f"  Optimized SSH command '{command}' failed: {cmd_e}")
+                    continue
+        finally:
+            if client and client is not ssh_client:
                 client.close()
-                
-            except Exception as cmd_e:
-                logger.warning(f"  Optimized SSH command '{command}' failed: {cmd_e}")
-                try:
-                    client.close()
-                except:
-                    pass
-                continue
         
         return routes
 
+    def _connect_ssh_optimized(self, ip: str, credentials: Dict[str, str]) -> paramiko.SSHClient:
+        """Open an SSH session with the short timeouts used for edge routers."""
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        
+        try:
+            client.connect(
+                ip,
+                username=credentials['username'],
+                password=credentials['password'],
+                timeout=10,  # Faster timeout: 10 seconds instead of 15
+                banner_timeout=10,
+                auth_timeout=10,
+                look_for_keys=False,
+                allow_agent=False
+            )
+        except Exception:
+            client.close()
+            raise
+        return client
+
     def _get_cli_command_list(self, system_info: Optional[SystemInfo]) -> List[str]:
         """Return ordered list of CLI commands with vendor-specific preference."""
         default_commands = self._default_cli_commands()
@@ -238,32 +466,14 @@ class NetworkDiscovery:
             vendor_commands = self.vendor_factory.auto_detect_commands(system_info)
             if vendor_commands:
                 # Append defaults that weren't included to ensure broad coverage
-                fallback = [cmd for cmd in default_commands if cmd not in vendor_commands]
+                vendor_command_set = set(vendor_commands)
+                fallback = [cmd for cmd in default_commands if cmd not in vendor_command_set]
                 return vendor_commands + fallback
         return default_commands
 
     def _default_cli_commands(self) -> List[str]:
         """Default set of CLI commands for generic devices."""
-        return [
-            "show ip route",           # Standard Cisco
-            "show route",              # Generic
-            "show ip route static",    # Static routes only
-            "show ip route connected", # Connected routes only  
-            "get route info",          # Some edge routers
-            "ip route show",           # Linux-style
-            # L3 Switch specific commands
-            "show routing-table",      # Some L3 switches
-            "show ip route summary",   # Route summary
-            "display ip routing-table", # Huawei/H3C style
-            # ASA-specific commands for NAT/VPN tunnels
-            "show crypto map",         # VPN tunnel information
-            "show nat",                # NAT translations
-            "show run | include tunnel", # Tunnel configurations
-            "show run | include nat",   # NAT configurations
-            "show vpn-sessiondb",      # Active VPN sessions
-            "show crypto ipsec sa",    # IPSec security associations
-            "show access-list",        # ACLs that might reveal networks
-        ]
+        return list(DEFAULT_CLI_COMMANDS)
 
     def _parse_routes_from_output(self, output: str, command: str) -> List[RouteEntry]:
         """Fallback parser that reuses legacy Cisco/ASA parsing logic."""
@@ -278,6 +488,9 @@ class NetworkDiscovery:
             return routes
 
         for line in output.splitlines():
+            # Every route format carries a dotted address; skip the parsers otherwise
+            if '.' not in line:
+                continue
             route = self._parse_cisco_route_line(line)
             if route:
                 routes.append(route)
@@ -303,6 +516,10 @@ class NetworkDiscovery:
                 logger.info(f"  Not classified as router, skipping")
                 return None
             
+            # One timestamp for the router and every route/network row saved with it,
+            # rather than a column-default utcnow() call per bulk-inserted row
+            now = datetime.utcnow()
+            
             # Store router - check if already exists
             existing_router = self.db.query(Router).filter(Router.ip_address == ip).first()
             if existing_router:
@@ -314,7 +531,7 @@ class NetworkDiscovery:
                 existing_router.router_score = 1.0
                 existing_router.classification_reason = "has_routing_table" if routes else "router_classification"
                 existing_router.discovered_via = discovery_method
-                existing_router.created_at = datetime.utcnow()
+                existing_router.created_at = now
                 logger.info(f"  Updated existing router {ip}")
                 router = existing_router
             else:
@@ -325,51 +542,42 @@ class NetworkDiscovery:
                     vendor=self._extract_vendor(system_info),
                     model=self._extract_model(system_info),
                     is_router=True,
-                    router_score=1.0
+                    router_score=1.0,
+                    created_at=now
                 )
                 router.classification_reason = "has_routing_table" if routes else "router_classification"
                 router.discovered_via = discovery_method
                 self.db.add(router)
                 logger.info(f"  Created new router {ip}")
             
-            self.db.commit()
+            # Routes and networks reference the router by IP, so the router row
+            # goes out with them in the single commit below
             
-            # Save routes
+            # (CIDR destination, next hop, protocol) of each route
+            route_rows = []
+            # Connected networks derived from the routes, reused for the networks below
+            route_networks = []
             for route in routes:
                 # Convert RouteEntry to CIDR format for database
                 if hasattr(route, 'destination') and hasattr(route, 'netmask'):
                     # Convert IP/Netmask to proper CIDR notation
-                    dest_ip = route.destination
-                    netmask = route.netmask
-                    
-                    # Calculate network address and CIDR prefix
-                    destination_cidr = self._ip_and_mask_to_cidr(dest_ip, netmask)
-                    
-                    existing_route = self.db.query(Route).filter(Route.source_router_ip == router.ip_address, Route.destination == destination_cidr).first()
-                    if not existing_route:
-                        db_route = Route(
-                            source_router_ip=router.ip_address,
-                            destination=destination_cidr,
-                            next_hop=route.next_hop,
-                            protocol=route.protocol if hasattr(route, 'protocol') else 'connected',
-                            discovered_via=discovery_method
-                        )
-                        self.db.add(db_route)
+                    destination_cidr = self._ip_and_mask_to_cidr(route.destination, route.netmask)
+                    next_hop = route.next_hop
+                    protocol = route.protocol if hasattr(route, 'protocol') else 'connected'
+                    if route.destination:
+                        route_networks.append(destination_cidr)
                 else:
                     # Handle legacy route format
                     destination_cidr = route.destination if '/' in route.destination else f"{route.destination}/24"
-                    existing_route = self.db.query(Route).filter(Route.source_router_ip == router.ip_address, Route.destination == destination_cidr).first()
-                    if not existing_route:
-                        db_route = Route(
-                            source_router_ip=router.ip_address,
-                            destination=destination_cidr,
-                            next_hop=getattr(route, 'next_hop', None),
-                            protocol=getattr(route, 'protocol', 'connected'),
-                            discovered_via=discovery_method
-                        )
-                        self.db.add(db_route)
+                    next_hop = getattr(route, 'next_hop', None)
+                    protocol = getattr(route, 'protocol', 'connected')
+                    if route.destination:
+                        route_networks.append(self._ip_and_mask_to_cidr(route.destination, '255.255.255.0'))
+                route_rows.append((destination_cidr, next_hop, protocol))
             
-            # Save networks/interfaces
+            # (network, interface name) from the interfaces, then the router's own
+            # network, then connected routes
+            network_rows = []
             for interface in interfaces:
                 # Handle both dict interfaces (from SNMP) and object interfaces (from SSH)
                 if isinstance(interface, dict):
@@ -384,61 +592,71 @@ class NetworkDiscovery:
                     interface_netmask = getattr(interface, 'netmask', '255.255.255.0')
                     interface_name = getattr(interface, 'name', 'unknown')
                     network_str = f"{getattr(interface, 'network', interface_ip)}/{interface_netmask}"
-                
-                # Check if this exact network already exists for this router in this run
-                existing_network = self.db.query(Network).filter(
-                    Network.router_ip == router.ip_address, 
-                    Network.network == network_str
-                ).first()
-                if not existing_network:
-                    network = Network(
-                        router_ip=router.ip_address,
-                        network=network_str,
-                        interface=interface_name,
-                        is_connected=True
-                    )
-                    self.db.add(network)
+                network_rows.append((network_str, interface_name))
             
             # CRITICAL FIX: Always create a network for the router's main IP address
             # This ensures we capture networks from traceroute discovery and router IPs
-            router_network = self._calculate_network_from_ip(ip, '255.255.255.0')
-            existing_router_network = self.db.query(Network).filter(
-                Network.router_ip == router.ip_address,
-                Network.network == router_network
-            ).first()
-            if not existing_router_network:
-                router_main_network = Network(
-                    router_ip=router.ip_address,
-                    network=router_network,
-                    interface='main_ip',
-                    is_connected=True
-                )
-                self.db.add(router_main_network)
-                logger.info(f"  Added main router network: {router_network} for {ip}")
+            network_rows.append((self._calculate_network_from_ip(ip, '255.255.255.0'), 'main_ip'))
             
             # Also create networks from discovered routes (connected routes)
-            for route in routes:
-                if hasattr(route, 'destination') and route.destination:
-                    # For connected routes, create network entries
-                    route_network = self._ip_and_mask_to_cidr(
-                        route.destination, 
-                        getattr(route, 'netmask', '255.255.255.0')
-                    )
-                    existing_route_network = self.db.query(Network).filter(
-                        Network.router_ip == router.ip_address,
-                        Network.network == route_network
-                    ).first()
-                    if not existing_route_network and route_network != router_network:
-                        route_network_entry = Network(
-                            router_ip=router.ip_address,
-                            network=route_network,
-                            interface='connected_route',
-                            is_connected=True
-                        )
-                        self.db.add(route_network_entry)
-                        logger.info(f"  Added route network: {route_network} for {ip}")
+            network_rows.extend((route_network, 'connected_route') for route_network in route_networks)
+            
+            # Routes and networks are only ever added, so when a router seen earlier in
+            # this run reports exactly what was saved for it then, there is nothing to
+            # look up or insert
+            fingerprint = hash((discovery_method, tuple(route_rows), tuple(network_rows)))
+            if existing_router and self._saved_fingerprints.get(ip) == fingerprint:
+                logger.debug("  Routes and networks unchanged for %s, refreshing router only", ip)
+                self.db.commit()
+                return router
+            
+            # Save routes - look up existing destinations once, then bulk insert the new ones
+            existing_destinations = {
+                destination for (destination,) in self.db.query(Route.destination).filter(
+                    Route.source_router_ip == router.ip_address
+                )
+            }
+            new_routes = []
+            for destination_cidr, next_hop, protocol in route_rows:
+                if destination_cidr not in existing_destinations:
+                    existing_destinations.add(destination_cidr)
+                    new_routes.append({
+                        'source_router_ip': router.ip_address,
+                        'destination': destination_cidr,
+                        'next_hop': next_hop,
+                        'protocol': protocol,
+                        'discovered_via': discovery_method,
+                        'created_at': now
+                    })
+            
+            # Save networks/interfaces - same pattern as routes
+            existing_networks = {
+                network for (network,) in self.db.query(Network.network).filter(
+                    Network.router_ip == router.ip_address
+                )
+            }
+            new_networks = []
+            for network_str, interface_name in network_rows:
+                if network_str not in existing_networks:
+                    existing_networks.add(network_str)
+                    new_networks.append({
+                        'router_ip': router.ip_address,
+                        'network': network_str,
+                        'interface': interface_name,
+                        'is_connected': True,
+                        'created_at': now
+                    })
+            logger.debug("  %d new routes and %d new networks for %s", len(new_routes), len(new_networks), ip)
+            
+            if len(new_routes) >= ROUTE_COPY_THRESHOLD and self.db.get_bind().dialect.name == 'postgresql':
+                self._copy_routes(new_routes)
+            elif new_routes:
+                self.db.bulk_insert_mappings(Route, new_routes)
+            if new_networks:
+                self.db.bulk_insert_mappings(Network, new_networks)
             
             self.db.commit()
+            self._saved_fingerprints[ip] = fingerprint
             return router
             
         except Exception as e:
@@ -448,174 +666,15 @@ class NetworkDiscovery:
     
     def _calculate_network_from_ip(self, ip: str, netmask: str) -> str:
         """Calculate network address from IP and netmask."""
-        try:
-            import ipaddress
-            network = ipaddress.IPv4Network(f"{ip}/{netmask}", strict=False)
-            return str(network)
-        except Exception as e:
-            logger.warning(f"Failed to calculate network for {ip}/{netmask}: {e}")
-            # Fallback to simple /24 if calculation fails
-            parts = ip.split('.')
-            if len(parts) == 4:
-                return f"{parts[0]}.{parts[1]}.{parts[2]}.0/24"
-            return f"{ip}/24"
-    
-    def _extract_vendor(self, system_info) -> str:
-        """Extract vendor from system info."""
-        if not system_info:
-            return None
-        
-        description = getattr(system_info, 'sys_descr', '').lower()
-        if 'cisco' in description:
-            return 'Cisco'
-        elif 'juniper' in description:
-            return 'Juniper'
-        elif 'cradlepoint' in description or 'rgos' in description:
-            return 'Cradlepoint'
-        elif 'mikrotik' in description or 'routeros' in description:
-            return 'Mikrotik'
-        else:
-            return None
-    
-    def _extract_model(self, system_info) -> str:
-        """Extract model from system info."""
-        if not system_info:
-            return None
-        
-        description = getattr(system_info, 'sys_descr', '')
-        # Simple model extraction - can be enhanced
-        if 'asa' in description.lower():
-            return 'ASA'
-        elif 'router' in description.lower():
-            return 'Router'
-        else:
-            return None
-    
-    def _get_system_info_snmp(self, ip: str, community: str) -> SystemInfo:
-        """Get system info via SNMP."""
-        try:
-            # Get system description
-            error_indication, error_status, error_index, var_binds = next(
-                getCmd(SnmpEngine(),
-                       CommunityData(community),
-                       UdpTransportTarget((ip, 161), timeout=self.snmp_timeout, retries=self.snmp_retries),
-                       ContextData(),
-                       ObjectType(ObjectIdentity('SNMPv2-MIB', 'sysDescr', 0)),
-                       ObjectType(ObjectIdentity('SNMPv2-MIB', 'sysName', 0)),
-                       ObjectType(ObjectIdentity('SNMPv2-MIB', 'sysObjectID', 0)))
-            )
-            
-            if error_indication:
-                raise Exception(f"SNMP error: {error_indication}")
-            
-            sys_descr = str(var_binds[0][1])
-            hostname = str(var_binds[1][1]) if len(var_binds) > 1 else None
-            sys_object_id = str(var_binds[2][1]) if len(var_binds) > 2 else None
-            
-            return SystemInfo(hostname=hostname, sys_descr=sys_descr, sys_object_id=sys_object_id)
-            
-        except Exception as e:
-            raise Exception(f"SNMP system info failed: {e}")
-    
-    def _get_routes_snmp(self, ip: str, community: str) -> List[RouteEntry]:
-        """Get routing table via SNMP."""
-        routes = []
-        
-        try:
-            # Walk the IP route table
-            for (error_indication, error_status, error_index, var_binds) in nextCmd(
-                SnmpEngine(),
-                CommunityData(community),
-                UdpTransportTarget((ip, 161), timeout=self.snmp_timeout, retries=self.snmp_retries),
-                ContextData(),
-                ObjectType(ObjectIdentity('IP-FORWARD-MIB', 'ipCidrRouteDest')),
-                lexicographicMode=False):
-                
-                if error_indication:
-                    break
-                
-                for var_bind in var_binds:
-                    route_dest = str(var_bind[1])
-                    if route_dest == '0.0.0.0':  # Skip default route for now
-                        continue
-                    
-                    # Get corresponding route info
-                    try:
-                        error_indication, error_status, error_index, var_binds = next(
-                            getCmd(SnmpEngine(),
-                                   CommunityData(community),
-                                   UdpTransportTarget((ip, 161)),
-                                   ContextData(),
-                                   ObjectType(ObjectIdentity('IP-FORWARD-MIB', 'ipCidrRouteMask', route_dest, '0.0.0.0', 0, 0)),
-                                   ObjectType(ObjectIdentity('IP-FORWARD-MIB', 'ipCidrRouteNextHop', route_dest, '0.0.0.0', 0, 0)),
-                                   ObjectType(ObjectIdentity('IP-FORWARD-MIB', 'ipCidrRouteProto', route_dest, '0.0.0.0', 0, 0)))
-                        )
-                        
-                        if not error_indication and len(var_binds) >= 3:
-                            netmask = str(var_binds[0][1])
-                            next_hop = str(var_binds[1][1])
-                            protocol = str(var_binds[2][1])
-                            
-                            routes.append(RouteEntry(
-                                destination=route_dest,
-                                netmask=netmask,
-                                next_hop=next_hop if next_hop != '0.0.0.0' else None,
-                                protocol=self._map_snmp_protocol(protocol)
-                            ))
-                    except:
-                        continue
-                        
-        except Exception as e:
-            logger.warning(f"SNMP route discovery failed: {e}")
-        
-        return routes
-    
-    def _get_interfaces_snmp(self, ip: str, community: str) -> List[Dict]:
-        """Get interface information via SNMP."""
-        interfaces = []
-        
-        try:
-            # Get interface descriptions and IP addresses
-            for (error_indication, error_status, error_index, var_binds) in nextCmd(
-                SnmpEngine(),
-                CommunityData(community),
-                UdpTransportTarget((ip, 161)),
-                ContextData(),
-                ObjectType(ObjectIdentity('IP-MIB', 'ipAdEntAddr')),
-                lexicographicMode=False):
-                
-                if error_indication:
-                    break
-                
-                for var_bind in var_binds:
-                    ip_addr = str(var_bind[1])
-                    if not self._is_valid_ip(ip_addr):
-                        continue
-                    
-                    try:
-                        # Get netmask for this IP
-                        error_indication, error_status, error_index, var_binds = next(
-                            getCmd(SnmpEngine(),
-                                   CommunityData(community),
-                                   UdpTransportTarget((ip, 161)),
-                                   ContextData(),
-                                   ObjectType(ObjectIdentity('IP-MIB', 'ipAdEntNetMask', ip_addr)))
-                        )
-                        
-                        if not error_indication and var_binds:
-                            netmask = str(var_binds[0][1])
-                            interfaces.append({
-                                'ip': ip_addr,
-                                'netmask': netmask,
-                                'name': f'if_{len(interfaces)}'
-                            })
-                    except:
-                        continue
-                        
-        except Exception as e:
-            logger.warning(f"SNMP interface discovery failed: {e}")
-        
-        return interfaces
+        network = _network_cidr(ip, netmask)
+        if network is not None:
+            return network
+        logger.warning(f"Failed to calculate network for {ip}/{netmask}")
+        # Fallback to simple /24 if calculation fails
+        parts = ip.split('.')
+        if len(parts) == 4:
+            return f"{parts[0]}.{parts[1]}.{parts[2]}.0/24"
+        return f"{ip}/24"
     
     def _get_routes_ssh(self, ip: str, credentials: Dict[str, str]) -> List[RouteEntry]:
         """Get routes via SSH/CLI fallback - using system SSH for ASA compatibility."""
@@ -678,24 +737,27 @@ class NetworkDiscovery:
                     if error_output and not error_output.strip().startswith('%'):
                         logger.warning(f"  SSH command stderr: {error_output}")
                     
-                    logger.info(f"  SSH command output ({len(output)} chars): {output[:2000]}")
+                    logger.debug("  SSH command output (%d chars): %s", len(output), output[:2000])
                     
                     for line in output.splitlines():
+                        # Every route format carries a dotted address; skip the parsers otherwise
+                        if '.' not in line:
+                            continue
                         route = self._parse_cisco_route_line(line)
                         if route:
-                            logger.info(f"  Parsed route: {route.destination}/{route.netmask} via {route.next_hop}")
+                            logger.debug("  Parsed route: %s/%s via %s", route.destination, route.netmask, route.next_hop)
                             routes.append(route)
                         else:
                             # Try to parse static route from config
                             config_route = self._parse_config_route_line(line)
                             if config_route:
-                                logger.info(f"  Parsed config route: {config_route.destination}/{config_route.netmask} via {config_route.next_hop}")
+                                logger.debug("  Parsed config route: %s/%s via %s", config_route.destination, config_route.netmask, config_route.next_hop)
                                 routes.append(config_route)
                             else:
                                 # Try ASA-specific route parsing
                                 asa_route = self._parse_asa_route_line(line)
                                 if asa_route:
-                                    logger.info(f"  Parsed ASA route: {asa_route.destination}/{asa_route.netmask} via {asa_route.next_hop}")
+                                    logger.debug("  Parsed ASA route: %s/%s via %s", asa_route.destination, asa_route.netmask, asa_route.next_hop)
                                     routes.append(asa_route)
                     
                     if routes:  # If we found routes, don't try more commands
@@ -780,18 +842,15 @@ class NetworkDiscovery:
         
         return interfaces
     
-    def _get_system_info_ssh(self, ip: str, credentials: Dict[str, str]) -> SystemInfo:
-        """Get system info via SSH/CLI."""
-        client = paramiko.SSHClient()
-        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    def _get_system_info_ssh(self, ip: str, credentials: Dict[str, str],
+                             ssh_client: Optional[paramiko.SSHClient] = None) -> SystemInfo:
+        """Get system info via SSH/CLI, over ssh_client if the caller already has a session open."""
+        client = ssh_client
         
         try:
-            client.connect(
-                hostname=ip,
-                username=credentials['username'],
-                password=credentials['password'],
-                timeout=10
-            )
+            if client is None:
+                # Password only, without first offering local keys and agent identities
+                client = self._connect_ssh_optimized(ip, credentials)
             
             # Get hostname
             stdin, stdout, stderr = client.exec_command('show running-config | include hostname', timeout=10)
@@ -809,15 +868,16 @@ class NetworkDiscovery:
             # Even if system info fails, return a basic SystemInfo to indicate we connected via SSH
             return SystemInfo(hostname="SSH-Connected", sys_descr="Cisco IOS Device")
         finally:
-            try:
-                client.close()
-            except:
-                pass
+            if ssh_client is None and client is not None:
+                try:
+                    client.close()
+                except:
+                    pass
     
     def _parse_cisco_route_line(self, line: str) -> Optional[RouteEntry]:
         """Parse a Cisco route line."""
         line = line.strip()
-        if not line or line.startswith("Gateway of last resort") or line.startswith("Codes:"):
+        if not line or line.startswith(("Gateway of last resort", "Codes:")):
             return None
         
         # Expected formats:
@@ -874,7 +934,7 @@ class NetworkDiscovery:
             )
             
         except Exception as e:
-            logger.debug(f"Failed to parse route line '{line}': {e}")
+            logger.debug("Failed to parse route line '%s': %s", line, e)
             return None
     
     def _parse_config_route_line(self, line: str) -> Optional[RouteEntry]:
@@ -912,7 +972,7 @@ class NetworkDiscovery:
             )
             
         except Exception as e:
-            logger.debug(f"Failed to parse config route line '{line}': {e}")
+            logger.debug("Failed to parse config route line '%s': %s", line, e)
             return None
     
     def _parse_asa_route_line(self, line: str) -> Optional[RouteEntry]:
@@ -960,7 +1020,7 @@ class NetworkDiscovery:
                 )
                 
         except Exception as e:
-            logger.debug(f"Failed to parse ASA route line '{line}': {e}")
+            logger.debug("Failed to parse ASA route line '%s': %s", line, e)
             return None
     
     def _parse_cisco_interface_line(self, line: str) -> Optional[Dict]:
@@ -999,30 +1059,13 @@ class NetworkDiscovery:
     
     def _is_private_ip(self, ip: str) -> bool:
         """Check if IP address is in private ranges."""
-        try:
-            parts = ip.split('.')
-            if len(parts) != 4:
-                return False
-            
-            first = int(parts[0])
-            second = int(parts[1])
-            
-            # 10.0.0.0/8
-            if first == 10:
-                return True
-            # 172.16.0.0/12
-            if first == 172 and 16 <= second <= 31:
-                return True
-            # 192.168.0.0/16
-            if first == 192 and second == 168:
-                return True
-            # 169.254.0.0/16 (link-local)
-            if first == 169 and second == 254:
-                return True
-                
+        if ip.count('.') != 3 or ip.partition('.')[0] not in _PRIVATE_FIRST_OCTETS:
             return False
-        except (ValueError, IndexError):
+        try:
+            ip_int = struct.unpack('!I', socket.inet_aton(ip))[0]
+        except OSError:
             return False
+        return any(ip_int & mask == network for network, mask in _PRIVATE_NETWORKS)
 
     def _get_network_segment(self, ip: str) -> str:
         """Get the network segment for an IP address."""
@@ -1062,12 +1105,16 @@ class NetworkDiscovery:
             for line in lines[1:]:  # Skip first line (header)
                 # Extract IP from each hop line
                 # Format: "1 10.120.0.2 1.234 ms 1.456 ms 1.789 ms"
-                match = re.search(r'\d+\s+(\d+\.\d+\.\d+\.\d+)', line)
-                if match:
-                    hop_ip = match.group(1)
-                    # Only include private IP addresses
-                    if self._is_private_ip(hop_ip) and hop_ip not in hops:
-                        hops.append(hop_ip)
+                # Unanswered hops ("2  * * *") have no address to match
+                if '.' not in line:
+                    continue
+                parts = line.split(None, 2)
+                if len(parts) < 2 or not parts[0].isdigit():
+                    continue
+                hop_ip = parts[1]
+                # Only include private IP addresses (this also rejects non-addresses)
+                if self._is_private_ip(hop_ip) and hop_ip not in hops:
+                    hops.append(hop_ip)
             
             return hops
             
@@ -1330,118 +1377,204 @@ class NetworkDiscovery:
         
         discovered_ips = set()
         
-        for target in targets:
+        # Traceroutes spend nearly all their time waiting on probes, so run them concurrently
+        futures = {_probe_executor.submit(self._perform_traceroute, target): target for target in targets}
+        for future in as_completed(futures):
+            target = futures[future]
             try:
-                logger.info(f"Tracerouting to {target}...")
-                hops = self._perform_traceroute(target)
-                logger.info(f"  Hops: {hops}")
-                
+                hops = future.result()
+                logger.info(f"Traceroute to {target} hops: {hops}")
+                    
                 for hop_ip in hops:
                     if hop_ip and hop_ip != root_ip:
-                        # Only exclude obvious localhost/Docker IPs, but include real network hops
-                        if not (hop_ip.startswith('127.') or hop_ip == '0.0.0.0'):
+                        # Only exclude obvious localhost/special IPs, but include real network hops
+                        if not hop_ip.startswith(_SKIP_HOP_PREFIXES):
                             discovered_ips.add(hop_ip)
                             logger.info(f"  Found potential router: {hop_ip}")
-                        
+                            
             except Exception as e:
                 logger.warning(f"Traceroute to {target} failed: {e}")
         
         logger.info(f"Total unique IPs discovered: {len(discovered_ips)}")
         
-        # Try to discover information about each new router IP
-        for ip in discovered_ips:
+        # Probe all new router IPs concurrently - SNMP is network bound.
+        # Results are saved below on this thread since the DB session is not thread safe.
+        futures = {
+            _probe_executor.submit(self._probe_traceroute_ip, ip, snmp_community): ip
+            for ip in discovered_ips
+        }
+        probes = []
+        for future in as_completed(futures):
             try:
-                logger.info(f"Attempting to discover router at {ip}...")
-                
-                # Try SNMP discovery
-                system_info = self.snmp_client.get_system_info(ip, snmp_community)
-                routes = []
-                interfaces = []
-                
-                if system_info:
-                    logger.info(f"  SNMP successful for {ip}")
-                    try:
-                        routes = self.snmp_client.get_routes(ip, snmp_community)
-                        interfaces = self.snmp_client.get_interfaces(ip, snmp_community)
-                        logger.info(f"  Got {len(routes)} routes and {len(interfaces)} interfaces")
-                    except Exception as e:
-                        logger.warning(f"  SNMP routes/interfaces failed: {e}")
-                        routes = []
-                        interfaces = []
-                    discovery_method = 'snmp'
-                    
-                    # Use the original _save_router method to get ALL data including routes and networks
-                    router = self._save_router(ip, system_info, routes, interfaces, discovery_method, None)
-                    if router:
-                        logger.info(f"  Successfully saved full router data: {ip}")
-                    continue
+                probes.append(future.result())
+            except Exception as e:
+                logger.error(f"Failed to discover router at {futures[future]}: {e}")
+        
+        # Hosts without SNMP fall back to a single ping sweep
+        alive = self._ping_hosts([probe[0] for probe in probes if not probe[1]])
+        
+        # Hops that didn't answer SNMP are saved together below
+        minimal_hops: List[Tuple[str, str]] = []
+        for ip, system_info, routes, interfaces, discovery_method in probes:
+            if not system_info:
+                if ip in alive:
+                    logger.info(f"  Ping successful for {ip} (no SNMP)")
+                    discovery_method = 'ping'
                 else:
-                    # Try basic ping check
-                    response = subprocess.run(['ping', '-c', '1', '-W', '2', ip], 
-                                            capture_output=True, text=True)
-                    if response.returncode == 0:
-                        logger.info(f"  Ping successful for {ip} (no SNMP)")
-                        discovery_method = 'ping'
-                    else:
-                        logger.info(f"  No ping response from {ip}, but discovered via traceroute")
-                        discovery_method = 'traceroute_only'
-                
-                # Create a basic router entry even without full discovery
-                # Force classification as router since we found it via traceroute
-                existing_router = self.db.query(Router).filter(Router.ip_address == ip).first()
-                if existing_router:
-                    logger.info(f"  Router already exists: {ip}")
-                    continue
-                
-                # Create new router with minimal info
-                router = Router(
-                    ip_address=ip,
-                    hostname=f"router-{ip.replace('.', '-')}",
-                    vendor="Unknown",
-                    model="Discovered via traceroute",
-                    is_router=True,  # Force classification as router
-                    router_score=0.5,  # Lower confidence but still a router
-                    discovered_via=discovery_method
-                )
-                router.classification_reason = "discovered_via_traceroute"
-                
-                self.db.add(router)
-                self.db.commit()
-                logger.info(f"  Successfully saved router discovered via traceroute: {ip}")
-                
-                # Also create a basic network entry for this router
-                router_network = self._calculate_network_from_ip(ip, '255.255.255.0')
-                existing_network = self.db.query(Network).filter(
-                    Network.router_ip == ip,
-                    Network.network == router_network
-                ).first()
-                if not existing_network:
-                    network = Network(
-                        router_ip=ip,
-                        network=router_network,
-                        interface='traceroute_discovery',
-                        is_connected=True
-                    )
-                    self.db.add(network)
-                    self.db.commit()
-                    logger.info(f"  Added network for traceroute router: {router_network}")
-                
+                    logger.info(f"  No ping response from {ip}, but discovered via traceroute")
+                    discovery_method = 'traceroute_only'
+                minimal_hops.append((ip, discovery_method))
+                continue
+            
+            try:
+                # Use the original _save_router method to get ALL data including routes and networks
+                router = self._save_router(ip, system_info, routes, interfaces, discovery_method, None)
+                if router:
+                    logger.info(f"  Successfully saved full router data: {ip}")
             except Exception as e:
                 logger.error(f"Failed to discover router at {ip}: {e}")
         
+        self._save_traceroute_routers(minimal_hops)
+        
         logger.info(f"Traceroute discovery completed, found {len(discovered_ips)} additional router IPs")
     
+    def _copy_routes(self, routes: List[dict]):
+        """Load route mappings with COPY, inside the session's current transaction."""
+        buf = io.StringIO()
+        for route in routes:
+            buf.write('\t'.join('\\N' if route[column] is None else str(route[column]) for column in ROUTE_COPY_COLUMNS))
+            buf.write('\n')
+        buf.seek(0)
+        
+        # The session's connection, so the rows commit or roll back with the router
+        cursor = self.db.connection().connection.cursor()
+        try:
+            cursor.copy_expert(f"COPY {Route.__tablename__} ({', '.join(ROUTE_COPY_COLUMNS)}) FROM STDIN", buf)
+        finally:
+            cursor.close()
+    
+    def _save_traceroute_routers(self, hops: List[Tuple[str, str]]):
+        """Save basic router and network entries for (ip, discovery_method) hops without SNMP.
+        
+        Routers are upserted in one INSERT ... ON CONFLICT DO NOTHING, which also keeps
+        a concurrent run saving the same hop from failing the batch; networks are
+        added for the routers it actually created, all in one commit.
+        """
+        if not hops:
+            return
+        
+        # Create a basic router entry even without full discovery
+        # Force classification as router since we found it via traceroute
+        new_routers = {}
+        for ip, discovery_method in hops:
+            new_routers.setdefault(ip, {
+                'ip_address': ip,
+                'hostname': f"router-{ip.replace('.', '-')}",
+                'vendor': "Unknown",
+                'model': "Discovered via traceroute",
+                'is_router': True,  # Force classification as router
+                'router_score': 0.5,  # Lower confidence but still a router
+                'classification_reason': "discovered_via_traceroute",
+                'discovered_via': discovery_method
+            })
+        
+        insert = pg_insert if self.db.get_bind().dialect.name == 'postgresql' else sqlite_insert
+        stmt = (
+            insert(Router)
+            .values(list(new_routers.values()))
+            .on_conflict_do_nothing(index_elements=[Router.ip_address])
+            .returning(Router.ip_address)
+        )
+        
+        try:
+            # ip_address is unique, so existing routers are skipped by the database
+            # and RETURNING lists only the rows that were inserted
+            created = set(self.db.scalars(stmt))
+            for ip in new_routers.keys() - created:
+                logger.info(f"  Router already exists: {ip}")
+            
+            existing_networks = {
+                (router_ip, network) for router_ip, network in
+                self.db.query(Network.router_ip, Network.network).filter(Network.router_ip.in_(created))
+            } if created else set()
+            
+            # Also create a basic network entry for each new router
+            new_networks = []
+            for ip in created:
+                router_network = self._calculate_network_from_ip(ip, '255.255.255.0')
+                if (ip, router_network) not in existing_networks:
+                    existing_networks.add((ip, router_network))
+                    new_networks.append({
+                        'router_ip': ip,
+                        'network': router_network,
+                        'interface': 'traceroute_discovery',
+                        'is_connected': True
+                    })
+            
+            if new_networks:
+                self.db.bulk_insert_mappings(Network, new_networks)
+            self.db.commit()
+            logger.info(f"  Saved {len(created)} routers and {len(new_networks)} networks discovered via traceroute")
+        except Exception as e:
+            logger.error(f"Failed to save traceroute routers: {e}")
+            self.db.rollback()
+    
+    def _probe_traceroute_ip(self, ip: str, snmp_community: str):
+        """Probe a traceroute hop via SNMP. Does not touch the DB."""
+        logger.info(f"Attempting to discover router at {ip}...")
+        
+        # Try SNMP discovery
+        system_info = self.snmp_client.get_system_info(ip, snmp_community)
+        routes = []
+        interfaces = []
+        
+        if system_info:
+            logger.info(f"  SNMP successful for {ip}")
+            try:
+                routes, interfaces = self.snmp_client.get_routes_and_interfaces(ip, snmp_community)
+                logger.info(f"  Got {len(routes)} routes and {len(interfaces)} interfaces")
+            except Exception as e:
+                logger.warning(f"  SNMP routes/interfaces failed: {e}")
+                routes = []
+                interfaces = []
+            discovery_method = 'snmp'
+        else:
+            # Reachability of non-SNMP hosts is checked afterwards in one batch
+            discovery_method = None
+        
+        return ip, system_info, routes, interfaces, discovery_method
+    
+    def _ping_hosts(self, ips: List[str]) -> Set[str]:
+        """Ping many hosts at once and return the ones that answered."""
+        if not ips:
+            return set()
+        try:
+            # fping probes all targets from one process instead of one ping process per host
+            response = subprocess.run(['fping', '-a', '-r', '0', '-t', '2000', *ips],
+                                      capture_output=True, text=True, timeout=30)
+            return set(response.stdout.split())
+        except FileNotFoundError:
+            def ping(ip: str) -> bool:
+                response = subprocess.run(['ping', '-c', '1', '-W', '2', ip], 
+                                        capture_output=True, text=True)
+                return response.returncode == 0
+            return {ip for ip, alive in zip(ips, _probe_executor.map(ping, ips)) if alive}
+        except subprocess.TimeoutExpired:
+            logger.warning(f"Ping sweep of {len(ips)} hosts timed out")
+            return set()
+    
     def _classify_router(self, system_info: SystemInfo, routes: List[RouteEntry], interfaces: List[Dict]) -> bool:
         """Simple router classification."""
+        # ipForwarding is the agent's own answer, and hosts also report routes
+        # (a default route at least), so it decides whenever the agent gave one
+        if system_info and system_info.ip_forwarding is not None:
+            return system_info.ip_forwarding
         if len(routes) > 0:
             return True
         if len(interfaces) > 2:  # More than 2 interfaces likely a router
             return True
-        if system_info and system_info.sys_descr:
-            descr = system_info.sys_descr.lower()
-            if any(keyword in descr for keyword in ['router', 'ios', 'junos', 'nx-os', 'cisco']):
-                return True
-        # If we have system info via SSH, it's likely a manageable router
+        # If we have system info via SSH, it's likely a manageable router.
+        # Any sysDescr qualifies here, so there is no need to scan it for keywords.
         if system_info and (system_info.hostname or system_info.sys_descr):
             return True
         return False
@@ -1450,79 +1583,34 @@ class NetworkDiscovery:
         """Extract vendor from system description."""
         if not system_info or not system_info.sys_descr:
             return None
-        
-        descr = system_info.sys_descr.lower()
-        vendors = ['cisco', 'juniper', 'arista', 'ubiquiti', 'mikrotik', 'fortinet']
-        
-        for vendor in vendors:
-            if vendor in descr:
-                return vendor.capitalize()
-        
-        return None
+        return _parse_vendor_model(system_info.sys_descr, system_info.sys_object_id)[0]
     
     def _extract_model(self, system_info: SystemInfo) -> Optional[str]:
         """Extract model from system description."""
         if not system_info or not system_info.sys_descr:
             return None
-        
-        descr = system_info.sys_descr
-        # Simple pattern matching for common models
-        import re
-        
-        # Cisco patterns
-        cisco_patterns = [
-            r'(ISR \d+)',
-            r'(ASR \d+)',
-            r'(Catalyst \d+)',
-            r'(\d+系列)',
-        ]
-        
-        for pattern in cisco_patterns:
-            match = re.search(pattern, descr)
-            if match:
-                return match.group(1)
-        
-        return None
+        return _parse_vendor_model(system_info.sys_descr, system_info.sys_object_id)[1]
     
     def _ip_and_mask_to_cidr(self, ip: str, netmask: str) -> str:
         """Convert IP and netmask to proper CIDR notation."""
-        try:
-            # Convert netmask to CIDR prefix length
-            mask_parts = netmask.split('.')
-            prefix_length = 0
-            for part in mask_parts:
-                octet = int(part)
-                while octet > 0:
-                    prefix_length += octet & 1
-                    octet >>= 1
-            
-            # Calculate network address
-            ip_parts = [int(part) for part in ip.split('.')]
-            mask_parts = [int(part) for part in netmask.split('.')]
-            network_parts = []
-            for i in range(4):
-                network_parts.append(ip_parts[i] & mask_parts[i])
-            
-            network_ip = '.'.join(str(part) for part in network_parts)
-            return f"{network_ip}/{prefix_length}"
-        except Exception:
-            return f"{ip}/24"  # Fallback
+        return _network_cidr(ip, netmask) or f"{ip}/24"  # Fallback
     
     def _is_valid_ip(self, ip: str) -> bool:
         """Check if IP address is valid."""
+        # inet_aton also accepts short forms like "10.1", hence the dot count
+        if ip.count('.') != 3 or ip == '0.0.0.0':
+            return False
         try:
-            IPv4Address(ip)
-            return ip != '0.0.0.0'
-        except:
+            socket.inet_aton(ip)
+            return True
+        except OSError:
             return False
     
     def _prefix_to_netmask(self, prefix: int) -> str:
         """Convert prefix length to netmask."""
-        try:
-            network = ip_network(f"0.0.0.0/{prefix}")
-            return str(network.netmask)
-        except:
+        if not 0 <= prefix <= 32:
             return "255.255.255.255"
+        return socket.inet_ntoa(struct.pack('!I', (0xFFFFFFFF << (32 - prefix)) & 0xFFFFFFFF))
     
     def _map_snmp_protocol(self, protocol_num: str) -> str:
         """Map SNMP protocol number to protocol name."""
@@ -2,15 +2,17 @@ import os
 import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
-from .database import init_db
+from .database import init_db, async_engine
 from .api import router as discovery_router
 from .error_handling import error_handling_middleware
 
 # Setup basic logging (will be overridden by our custom logger)
 logging.basicConfig(
     level=os.getenv("LOG_LEVEL", "INFO"),
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    # Devices are probed concurrently; the thread name tells their log lines apart
+    format='%(asctime)s - %(threadName)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
 
@@ -18,7 +20,10 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="Network Discovery Service",
     description="Simplified network router discovery and topology mapping",
-    version="1.0.0"
+    version="1.0.0",
+    # Table and inventory responses can run to thousands of rows; orjson
+    # encodes them several times faster than the stdlib encoder
+    default_response_class=ORJSONResponse
 )
 
 # Add error handling middleware (must be first)
@@ -33,12 +38,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize database
+# Initialize database on startup. Deployments that run `python -m app.migrate`
+# as a one-shot job first (see docker-compose.yml) set RUN_DB_MIGRATIONS=false
+# so each worker doesn't repeat it.
 @app.on_event("startup")
 async def startup():
-    logger.info("Initializing database...")
-    init_db()
-    logger.info("Database ready")
+    if os.getenv("RUN_DB_MIGRATIONS", "true").lower() == "true":
+        logger.info("Initializing database...")
+        init_db()
+        logger.info("Database ready")
+
+# Close the async engine's connections; an open aiosqlite connection's worker
+# thread would otherwise keep the process from exiting
+@app.on_event("shutdown")
+async def shutdown():
+    await async_engine.dispose()
 
 # Include routes
 app.include_router(discovery_router, prefix="/api/v1", tags=["discovery"])
@@ -47,9 +61,9 @@ app.include_router(discovery_router, prefix="/api/v1", tags=["discovery"])
 from .api import router as inventory_router
 app.include_router(inventory_router, prefix="/api", tags=["inventory"])
 
-# Health check endpoint
+# Health check endpoint - async, so polling it doesn't take a threadpool worker
 @app.get("/health")
-def health_check():
+async def health_check():
     """Simple health check endpoint."""
     return {"status": "healthy", "service": "network-discovery-simplified"}
 
@@ -66,4 +80,7 @@ def root():
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    # The UI fans out one request per router; keep its connections open between
+    # bursts instead of uvicorn's 5s default so they are reused, not reopened
+    keep_alive = int(os.getenv("KEEP_ALIVE_TIMEOUT", 75))
+    uvicorn.run(app, host="0.0.0.0", port=port, timeout_keep_alive=keep_alive)
@@ -0,0 +1,22 @@
+"""
+One-shot schema setup. Run once per deployment before starting API workers:
+
+    python -m app.migrate
+"""
+
+import logging
+
+from .database import init_db
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    logger.info("Initializing database...")
+    init_db()
+    logger.info("Database ready")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Float, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -34,6 +34,11 @@ class Router(Base):
     classification_reason = Column(Text, nullable=True)
     discovered_via = Column(String(20), default='snmp')  # snmp, cli, both
     created_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Relationships (routes/networks reference the router by IP, not by ID).
+    # Lazy by default; endpoints that need them use selectinload at the query site.
+    routes = relationship("Route", primaryjoin="Router.ip_address == foreign(Route.source_router_ip)", viewonly=True)
+    networks = relationship("Network", primaryjoin="Router.ip_address == foreign(Network.router_ip)", viewonly=True)
 
 
 class Route(Base):
@@ -48,6 +53,12 @@ class Route(Base):
     metric = Column(Integer, nullable=True)
     discovered_via = Column(String(20), default='snmp')  # snmp, cli
     created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index('idx_routes_router_destination', 'source_router_ip', 'destination',
+              postgresql_include=['next_hop', 'protocol']),
+        Index('idx_routes_destination', 'destination'),
+    )
 
 
 class Network(Base):
@@ -59,6 +70,11 @@ class Network(Base):
     interface = Column(String(50), nullable=True)
     is_connected = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index('idx_networks_router_network', 'router_ip', 'network'),
+        Index('idx_networks_network', 'network', postgresql_include=['router_ip']),
+    )
 
 
 class TopologyLink(Base):
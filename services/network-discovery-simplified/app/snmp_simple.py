@@ -3,24 +3,138 @@ Simple SNMP implementation that avoids pysnmp compatibility issues.
 Uses subprocess to call snmpwalk/snmpget commands for basic operations.
 """
 
+import os
 import subprocess
+import threading
+import time
 import logging
-import re
-from typing import List, Optional
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
 from .types import SystemInfo, RouteEntry
 
 logger = logging.getLogger(__name__)
 
+# SNMPv2-MIB system scalars
+SYS_DESCR_OID = '1.3.6.1.2.1.1.1.0'
+SYS_OBJECT_ID_OID = '1.3.6.1.2.1.1.2.0'
+SYS_NAME_OID = '1.3.6.1.2.1.1.5.0'
+
+# IP-MIB ipForwarding.0: forwarding(1), notForwarding(2)
+IP_FORWARDING_OID = '1.3.6.1.2.1.4.1.0'
+IP_FORWARDING_VALUES = {'1': True, 'forwarding(1)': True, '2': False, 'notForwarding(2)': False}
+
+# ipAddrTable / ipRouteTable columns
+IP_AD_ENT_NETMASK_OID = '1.3.6.1.2.1.4.20.1.3'
+IP_ROUTE_MASK_OID = '1.3.6.1.2.1.4.21.1.11'
+
+# Type prefix net-snmp prints before IpAddress values
+IP_ADDRESS_TYPE = 'IpAddress: '
+
+# Default max-repetitions for GETBULK table walks. ipAddrTable is small; the
+# route table can run to thousands of rows, so it gets larger bulk responses.
+DEFAULT_MAX_REPETITIONS = int(os.getenv('SNMP_MAX_REPETITIONS', '25'))
+DEFAULT_ROUTE_MAX_REPETITIONS = int(os.getenv('SNMP_ROUTE_MAX_REPETITIONS', '50'))
+
+# Seconds a device's interface addresses are reused before walking ipAddrTable
+# again. Addressing changes far less often than a device is revisited (BFS and
+# traceroute probes in one run, back-to-back runs). 0 disables the cache.
+IF_CACHE_TTL = float(os.getenv('IF_CACHE_TTL', '600'))
+
+# Seconds an agent that didn't answer the system info get is skipped, so hosts
+# seen again (BFS then traceroute, back-to-back runs) don't spawn snmpget and
+# wait out the timeout each time. 0 disables the cache.
+SNMP_UNREACHABLE_TTL = float(os.getenv('SNMP_UNREACHABLE_TTL', '300'))
+
+# Interface walks run here alongside the caller's route walk. Kept separate from
+# the discovery probe pool, whose workers block on these futures, and sized to
+# match it (PROBE_WORKERS) since each probe waits on at most one walk.
+_walk_executor = ThreadPoolExecutor(max_workers=int(os.getenv('PROBE_WORKERS', '16')),
+                                    thread_name_prefix='snmp-walk')
+
+
+class SnmpTooBigError(Exception):
+    """Agent answered with a tooBig error; the request must be made smaller."""
+
 
 class SimpleSnmpClient:
     """Simple SNMP client using system snmp commands."""
     
-    def __init__(self, timeout: int = 5, retries: int = 2):
+    def __init__(self, timeout: int = 5, retries: int = 2,
+                 max_repetitions: int = DEFAULT_MAX_REPETITIONS,
+                 route_max_repetitions: int = DEFAULT_ROUTE_MAX_REPETITIONS):
         self.timeout = timeout
         self.retries = retries
+        self.max_repetitions = max_repetitions
+        self.route_max_repetitions = route_max_repetitions
+        # Common argv prefix per (command, ip, community), reused across queries
+        self._command_cache: Dict[Tuple[str, str, str], List[str]] = {}
+        # Largest max-repetitions each agent has accepted after a tooBig, so later
+        # walks of the same device start there instead of failing again
+        self._max_repetitions_cache: Dict[str, int] = {}
+        # ip -> (monotonic time walked, interfaces)
+        self._interface_cache: Dict[str, Tuple[float, List[dict]]] = {}
+        # (ip, community) -> monotonic time the agent last failed to answer
+        self._unreachable: Dict[Tuple[str, str], float] = {}
     
-    def _run_snmp_command(self, command: List[str]) -> Optional[str]:
-        """Run SNMP command and return output."""
+    def _snmp_command(self, command: str, ip: str, community: str, *oids: str) -> List[str]:
+        """Build an snmpget/snmpwalk/snmpbulkwalk command line for ip, reusing the cached prefix."""
+        key = (command, ip, community)
+        prefix = self._command_cache.get(key)
+        if prefix is None:
+            # Output is parsed by numeric OID, so skip loading the MIB tree on every spawn.
+            # net-snmp's own retry schedule (1s x 6 tries by default) outlasts the
+            # subprocess timeout, so a dead agent was only ever given up on by the
+            # kill. Bound it by -t/-r, leaving one try's worth of the timeout spare
+            # for process start-up so snmp* gives up before it is killed.
+            per_try = self.timeout / (self.retries + 2)
+            prefix = self._command_cache[key] = [command, '-v2c', '-c', community, '-On', '-m', '',
+                                                 '-t', f'{per_try:g}', '-r', str(self.retries), ip]
+        return prefix + list(oids)
+    
+    def _bulk_walk(self, ip: str, community: str, oid: str, max_repetitions: int) -> Optional[Dict[str, str]]:
+        """Walk a netmask column with GETBULK and return its rows keyed by the indexed IP.
+        
+        Halves max-repetitions if the agent reports tooBig.
+        """
+        prefix = self._snmp_command('snmpbulkwalk', ip, community)
+        max_repetitions = min(max_repetitions, self._max_repetitions_cache.get(ip, max_repetitions))
+        while True:
+            # Options must precede the agent address
+            cmd = prefix[:-1] + [f'-Cr{max_repetitions}', ip, oid]
+            try:
+                return self._stream_snmp_masks(cmd, oid, raise_too_big=max_repetitions > 1)
+            except SnmpTooBigError:
+                max_repetitions //= 2
+                self._max_repetitions_cache[ip] = max_repetitions
+                logger.debug(f"tooBig from {ip}, retrying {oid} with max-repetitions {max_repetitions}")
+    
+    def _parse_get_output(self, output: str) -> Dict[str, str]:
+        """Parse numeric snmpget output into an OID -> value mapping."""
+        values = {}
+        oid = None
+        for line in output.splitlines():
+            head, sep, value = line.partition(' = ')
+            if sep and head.startswith('.'):
+                oid = head[1:]
+                # Strip the "STRING: " style type prefix
+                _, sep, typed_value = value.partition(': ')
+                if sep:
+                    value = typed_value
+                values[oid] = value.strip().strip('"')
+            elif oid is not None:
+                # Multi-line string values continue on the following lines
+                values[oid] = f"{values[oid]}\n{line}".strip().strip('"')
+        return values
+    
+    def _run_snmp_command(self, command: List[str], raise_too_big: bool = False,
+                          allow_partial: bool = False) -> Optional[str]:
+        """Run SNMP command and return output.
+        
+        With allow_partial, output is still returned when the command exits non-zero
+        but printed values. snmpget drops a varbind the agent rejected and retries
+        the rest, but exits non-zero even when that retry succeeds.
+        """
         try:
             result = subprocess.run(
                 command,
@@ -31,10 +145,17 @@ class SimpleSnmpClient:
             
             if result.returncode == 0:
                 return result.stdout
+            elif raise_too_big and 'tooBig' in result.stderr:
+                raise SnmpTooBigError(result.stderr)
+            elif allow_partial and result.stdout.strip():
+                logger.debug(f"SNMP command returned partial results: {result.stderr}")
+                return result.stdout
             else:
                 logger.warning(f"SNMP command failed: {result.stderr}")
                 return None
                 
+        except SnmpTooBigError:
+            raise
         except subprocess.TimeoutExpired:
             logger.warning("SNMP command timed out")
             return None
@@ -42,25 +163,92 @@ class SimpleSnmpClient:
             logger.error(f"SNMP command error: {e}")
             return None
     
+    def _stream_snmp_masks(self, command: List[str], column_oid: str,
+                           raise_too_big: bool = False) -> Optional[Dict[str, str]]:
+        """Run a netmask column walk, parsing rows as the walk prints them.
+        
+        Route tables can run to thousands of rows, so they are parsed straight off
+        the pipe rather than buffered into one string and split. As with
+        _run_snmp_command, nothing is returned if the walk fails or times out.
+        """
+        try:
+            proc = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        except Exception as e:
+            logger.error(f"SNMP command error: {e}")
+            return None
+        
+        # Bound the whole walk, as subprocess.run's timeout does
+        timed_out = threading.Event()
+        
+        def kill():
+            timed_out.set()
+            proc.kill()
+        
+        timer = threading.Timer(self.timeout, kill)
+        timer.start()
+        try:
+            masks = self._parse_snmp_masks(proc.stdout, column_oid)
+            stderr = proc.stderr.read()
+            returncode = proc.wait()
+        except Exception as e:
+            proc.kill()
+            proc.wait()
+            logger.error(f"SNMP command error: {e}")
+            return None
+        finally:
+            timer.cancel()
+            proc.stdout.close()
+            proc.stderr.close()
+        
+        if timed_out.is_set():
+            logger.warning("SNMP command timed out")
+            return None
+        if returncode == 0:
+            return masks
+        if raise_too_big and 'tooBig' in stderr:
+            raise SnmpTooBigError(stderr)
+        logger.warning(f"SNMP command failed: {stderr}")
+        return None
+    
     def get_system_info(self, ip: str, community: str) -> Optional[SystemInfo]:
         """Get system info via SNMP."""
+        failed_at = self._unreachable.get((ip, community))
+        if failed_at is not None and time.monotonic() - failed_at < SNMP_UNREACHABLE_TTL:
+            logger.debug("Skipping SNMP to %s, no answer in the last %ss", ip, SNMP_UNREACHABLE_TTL)
+            return None
+        
         try:
-            # Get system description using numeric OID
-            cmd = ['snmpget', '-v2c', '-c', community, '-On', ip, '1.3.6.1.2.1.1.1.0']
-            output = self._run_snmp_command(cmd)
+            # Get system description, name, object ID and ipForwarding in a single request.
+            # Missing objects come back as noSuchObject without failing the others.
+            cmd = self._snmp_command('snmpget', ip, community,
+                                     SYS_DESCR_OID, SYS_NAME_OID, SYS_OBJECT_ID_OID, IP_FORWARDING_OID)
+            output = self._run_snmp_command(cmd, allow_partial=True)
             if not output:
+                self._unreachable[(ip, community)] = time.monotonic()
+                # Don't keep serving the addressing of an agent that stopped answering
+                self._interface_cache.pop(ip, None)
                 return None
+            self._unreachable.pop((ip, community), None)
             
-            sys_descr = output.split(':')[-1].strip().strip('"')
+            values = self._parse_get_output(output)
+            sys_descr = values.get(SYS_DESCR_OID)
+            if sys_descr is None or 'No Such Object' in sys_descr:
+                return None
             
-            # Get system name using numeric OID
-            cmd = ['snmpget', '-v2c', '-c', community, '-On', ip, '1.3.6.1.2.1.1.5.0']
-            output = self._run_snmp_command(cmd)
-            hostname = None
-            if output and 'No Such Object' not in output:
-                hostname = output.split(':')[-1].strip().strip('"')
+            hostname = values.get(SYS_NAME_OID)
+            if hostname and 'No Such Object' in hostname:
+                hostname = None
+            
+            sys_object_id = values.get(SYS_OBJECT_ID_OID)
+            if sys_object_id and 'No Such Object' in sys_object_id:
+                sys_object_id = None
+            elif sys_object_id:
+                sys_object_id = sys_object_id.lstrip('.')
             
-            return SystemInfo(hostname=hostname, sys_descr=sys_descr, sys_object_id=None)
+            ip_forwarding = IP_FORWARDING_VALUES.get(values.get(IP_FORWARDING_OID))
+            
+            return SystemInfo(hostname=hostname, sys_descr=sys_descr, sys_object_id=sys_object_id,
+                              ip_forwarding=ip_forwarding)
             
         except Exception as e:
             logger.error(f"Failed to get system info from {ip}: {e}")
@@ -71,32 +259,22 @@ class SimpleSnmpClient:
         routes = []
         
         try:
-            # Get routing table destinations
-            dest_cmd = ['snmpwalk', '-v2c', '-c', community, '-On', ip, '1.3.6.1.2.1.4.21.1.1']
-            dest_output = self._run_snmp_command(dest_cmd)
-            
-            # Get routing table netmasks
-            mask_cmd = ['snmpwalk', '-v2c', '-c', community, '-On', ip, '1.3.6.1.2.1.4.21.1.11']
-            mask_output = self._run_snmp_command(mask_cmd)
+            # ipRouteTable is indexed by ipRouteDest, so the mask column alone
+            # yields every destination and its netmask
+            mask_routes = self._bulk_walk(ip, community, IP_ROUTE_MASK_OID, self.route_max_repetitions)
             
-            if dest_output and mask_output:
-                # Parse destinations and netmasks
-                dest_routes = self._parse_snmp_routes(dest_output)
-                mask_routes = self._parse_snmp_masks(mask_output)
-                
-                # Combine destinations with their netmasks
-                for dest_ip in dest_routes:
-                    if self._is_valid_route_ip(dest_ip, ip):
-                        netmask = mask_routes.get(dest_ip, "255.255.255.0")  # Default to /24 if not found
-                        cidr_notation = self._ip_and_mask_to_cidr(dest_ip, netmask)
-                        
-                        routes.append(RouteEntry(
-                            destination=dest_ip,
-                            netmask=netmask,
-                            next_hop="0.0.0.0",
-                            protocol='snmp'
-                        ))
-                        logger.debug(f"Added valid route: {dest_ip}/{netmask}")
+            if mask_routes:
+                routes = [
+                    RouteEntry(
+                        destination=dest_ip,
+                        netmask=netmask,
+                        next_hop="0.0.0.0",
+                        protocol='snmp'
+                    )
+                    for dest_ip, netmask in mask_routes.items()
+                    if self._is_valid_route_ip(dest_ip, ip)
+                ]
+                logger.debug(f"Added {len(routes)} valid routes from {len(mask_routes)} rows")
             
             # Always add the local connected route for the device itself
             local_network = self._get_local_network(ip)
@@ -122,100 +300,49 @@ class SimpleSnmpClient:
             ))
             return routes
     
-    def _parse_snmp_routes(self, output: str) -> List[str]:
-        """Parse destination IPs from SNMP route output."""
-        routes = []
-        for line in output.splitlines():
-            line = line.strip()
-            if 'IpAddress:' in line:
-                try:
-                    ip_match = re.search(r'IpAddress: (\d+\.\d+\.\d+\.\d+)', line)
-                    if ip_match:
-                        dest_ip = ip_match.group(1)
-                        routes.append(dest_ip)
-                except Exception as e:
-                    logger.debug(f"Failed to parse route line: {line}, error: {e}")
-                    continue
-        return routes
-    
-    def _parse_snmp_masks(self, output: str) -> dict:
-        """Parse netmask mapping from SNMP mask output."""
+    def _parse_snmp_masks(self, lines: Iterable[str], column_oid: str) -> Dict[str, str]:
+        """Parse netmask mapping (keyed by the IP in the row index) from walk lines of column_oid.
+        
+        Rows look like ".<column_oid>.<a>.<b>.<c>.<d> = IpAddress: <mask>", so the index
+        and value are cut out by fixed offsets rather than splitting and re-joining the OID.
+        """
         masks = {}
-        for line in output.splitlines():
-            line = line.strip()
-            if 'IpAddress:' in line:
-                try:
-                    # Extract the IP from the OID (part before =)
-                    oid_part = line.split('=')[0].strip()
-                    # Extract the IP from the OID (last 4 octets)
-                    oid_parts = oid_part.split('.')
-                    if len(oid_parts) >= 4:
-                        dest_ip = f"{oid_parts[-4]}.{oid_parts[-3]}.{oid_parts[-2]}.{oid_parts[-1]}"
-                        
-                        # Extract the netmask from the value
-                        mask_match = re.search(r'IpAddress: (\d+\.\d+\.\d+\.\d+)', line)
-                        if mask_match:
-                            netmask = mask_match.group(1)
-                            masks[dest_ip] = netmask
-                except Exception as e:
-                    logger.debug(f"Failed to parse mask line: {line}, error: {e}")
-                    continue
+        index_start = len(column_oid) + 2
+        value_start = len(' = ' + IP_ADDRESS_TYPE)
+        for line in lines:
+            sep = line.find(' = ' + IP_ADDRESS_TYPE, index_start)
+            if sep < 0:
+                continue
+            dest_ip = line[index_start:sep]
+            netmask = line[sep + value_start:].strip()
+            if dest_ip.count('.') != 3:
+                logger.debug("Failed to parse mask line: %s", line.rstrip())
+                continue
+            try:
+                socket.inet_aton(dest_ip)
+                socket.inet_aton(netmask)
+            except OSError:
+                logger.debug("Failed to parse mask line: %s", line.rstrip())
+                continue
+            masks[dest_ip] = netmask
         return masks
     
-    def _ip_and_mask_to_cidr(self, ip: str, netmask: str) -> str:
-        """Convert IP and netmask to CIDR notation."""
-        try:
-            # Convert netmask to CIDR prefix length
-            mask_parts = netmask.split('.')
-            prefix_length = 0
-            for part in mask_parts:
-                octet = int(part)
-                while octet > 0:
-                    prefix_length += octet & 1
-                    octet >>= 1
-            return f"{ip}/{prefix_length}"
-        except Exception:
-            return f"{ip}/24"  # Fallback
-    
     def _is_valid_route_ip(self, dest_ip: str, device_ip: str) -> bool:
         """Validate that a route IP is legitimate for this network."""
+        # ONLY accept IPs that are in your known network ranges
+        # Your networks are: 10.120.x.x, 10.121.x.x, 10.66.x.x, etc.
+        # Also allow 0.0.0.0 for default routes. This rejects 1.x.x.x garbage,
+        # multicast, loopback and everything else. The cheap prefix test runs
+        # first so rejected rows never reach inet_aton.
+        if dest_ip == "0.0.0.0":
+            return True
+        if not dest_ip.startswith('10.') or dest_ip.count('.') != 3:
+            return False
         try:
-            parts = dest_ip.split('.')
-            if len(parts) != 4:
-                return False
-            
-            # Convert to integers for validation
-            octets = [int(part) for part in parts]
-            
-            # STRICT FILTERING - Absolutely no 1.x.x.x addresses
-            if octets[0] == 1:  # NEVER accept 1.x.x.x - these are garbage
-                return False
-            
-            # Filter out other invalid IPs
-            if octets[0] == 0 and dest_ip != "0.0.0.0":
-                return False
-            if octets[0] == 255 and dest_ip != "255.255.255.255":
-                return False
-            if octets[0] >= 224:  # Multicast and above
-                return False
-            if octets[0] == 127 and dest_ip != "127.0.0.1":  # Loopback
-                return False
-            
-            # ONLY accept IPs that are in your known network ranges
-            # Your networks are: 10.120.x.x, 10.121.x.x, 10.66.x.x, etc.
-            # Also allow 0.0.0.0 for default routes
-            if octets[0] == 10:
-                # Accept 10.x.x.x addresses
-                return True
-            elif dest_ip == "0.0.0.0":
-                # Accept default route
-                return True
-            else:
-                # REJECT everything else (including 1.x.x.x)
-                return False
-            
-        except Exception:
+            socket.inet_aton(dest_ip)
+        except OSError:
             return False
+        return True
     
     def _get_local_network(self, ip: str) -> str:
         """Get the local network for this device IP."""
@@ -227,75 +354,65 @@ class SimpleSnmpClient:
         except Exception:
             return f"{ip}/24"
     
-    def _get_route_mask(self, ip: str, community: str, dest_ip: str) -> Optional[str]:
-        """Get netmask for a specific route."""
-        try:
-            cmd = ['snmpget', '-v2c', '-c', community, ip, f'IP-FORWARD-MIB::ipCidrRouteMask.{dest_ip.replace(".", ".")}.0.0.0.0.0']
-            output = self._run_snmp_command(cmd)
-            if output:
-                mask = output.split(':')[-1].strip()
-                return mask
-        except:
-            pass
-        return None
-    
-    def _get_route_next_hop(self, ip: str, community: str, dest_ip: str) -> Optional[str]:
-        """Get next hop for a specific route."""
-        try:
-            cmd = ['snmpget', '-v2c', '-c', community, ip, f'IP-FORWARD-MIB::ipCidrRouteNextHop.{dest_ip.replace(".", ".")}.0.0.0.0.0']
-            output = self._run_snmp_command(cmd)
-            if output:
-                next_hop = output.split(':')[-1].strip()
-                if next_hop and next_hop != '0.0.0.0':
-                    return next_hop
-        except:
-            pass
-        return None
-    
     def get_interfaces(self, ip: str, community: str) -> List[dict]:
         """Get interface information via SNMP."""
         interfaces = []
         
+        cached = self._cached_interfaces(ip)
+        if cached is not None:
+            return cached
+        
         try:
-            # Get IP addresses using numeric OID
-            cmd = ['snmpwalk', '-v2c', '-c', community, '-On', ip, '1.3.6.1.2.1.4.20.1.1']
-            output = self._run_snmp_command(cmd)
+            # ipAddrTable is indexed by ipAdEntAddr, so the netmask column alone
+            # yields every interface address and its mask
+            masks = self._bulk_walk(ip, community, IP_AD_ENT_NETMASK_OID, self.max_repetitions)
             
-            if not output:
+            if not masks:
                 return interfaces
             
-            for line in output.splitlines():
-                line = line.strip()
-                if 'IpAddress:' in line:
-                    try:
-                        ip_addr = line.split(':')[-1].strip()
-                        
-                        # Get netmask for this IP using numeric OID
-                        mask_cmd = ['snmpget', '-v2c', '-c', community, '-On', ip, f'1.3.6.1.2.1.4.20.1.3.{ip_addr}']
-                        mask_output = self._run_snmp_command(mask_cmd)
-                        
-                        if mask_output and 'IpAddress:' in mask_output:
-                            netmask = mask_output.split(':')[-1].strip()
-                            interfaces.append({
-                                'ip': ip_addr,
-                                'netmask': netmask,
-                                'name': f'if_{len(interfaces)}'
-                            })
-                    except Exception as e:
-                        logger.debug(f"Failed to parse interface line: {line}, error: {e}")
-                        continue
+            interfaces = [
+                {'ip': ip_addr, 'netmask': netmask, 'name': f'if_{index}'}
+                for index, (ip_addr, netmask) in enumerate(masks.items())
+            ]
+            if interfaces:
+                self._interface_cache[ip] = (time.monotonic(), interfaces)
             
-            return interfaces
+            return list(interfaces)
             
         except Exception as e:
             logger.error(f"Failed to get interfaces from {ip}: {e}")
+            self._interface_cache.pop(ip, None)
             return interfaces
     
+    def _cached_interfaces(self, ip: str) -> Optional[List[dict]]:
+        """Return a copy of ip's cached interfaces if they are still fresh."""
+        cached = self._interface_cache.get(ip)
+        if cached and time.monotonic() - cached[0] < IF_CACHE_TTL:
+            return list(cached[1])
+        return None
+    
+    def get_routes_and_interfaces(self, ip: str, community: str) -> Tuple[List[RouteEntry], List[dict]]:
+        """Get routes and interfaces, running both table walks against the device at once.
+        
+        net-snmp walks one subtree per process, so the two columns can't share a
+        session; when the interfaces are cached only the route walk is issued.
+        """
+        interfaces = self._cached_interfaces(ip)
+        if interfaces is not None:
+            return self.get_routes(ip, community), interfaces
+        interfaces_future = _walk_executor.submit(self.get_interfaces, ip, community)
+        routes = self.get_routes(ip, community)
+        return routes, interfaces_future.result()
+    
     def test_connectivity(self, ip: str, community: str) -> bool:
         """Test if SNMP is working on the target."""
         try:
-            cmd = ['snmpget', '-v2c', '-c', community, '-On', ip, '1.3.6.1.2.1.1.1.0']
+            cmd = self._snmp_command('snmpget', ip, community, SYS_DESCR_OID)
             output = self._run_snmp_command(cmd)
             return output is not None
         except:
             return False
+
+
+# Shared client so the per-target command cache survives across discovery runs
+snmp_client = SimpleSnmpClient(timeout=5, retries=2)
@@ -6,14 +6,15 @@ from dataclasses import dataclass
 from typing import Optional
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class SystemInfo:
     hostname: Optional[str] = None
     sys_descr: Optional[str] = None
     sys_object_id: Optional[str] = None
+    ip_forwarding: Optional[bool] = None
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class RouteEntry:
     destination: str
     netmask: str
@@ -21,7 +22,7 @@ class RouteEntry:
     protocol: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class CLIRouteEntry:
     destination: str
     prefix_length: int
@@ -10,6 +10,19 @@ from ..types import SystemInfo, RouteEntry
 
 logger = logging.getLogger(__name__)
 
+# ASA model patterns, compiled once
+_MODEL_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r'ASA(\d+)',                       # ASA5506, ASA5515, etc.
+    r'FirePower\s+(\d+)',              # FirePower 1000 series
+    r'Adaptive\s+Security\s+Appliance',
+))
+
+# crypto map / NAT configuration statements
+_ACL_RE = re.compile(r'access-list\s+(\d+)\s+permit\s+ip\s+(\d+\.\d+\.\d+\.\d+)\s+(\d+\.\d+\.\d+\.\d+)', re.IGNORECASE)
+_NETWORK_OBJ_RE = re.compile(r'network-object\s+host\s+(\d+\.\d+\.\d+\.\d+)', re.IGNORECASE)
+_NAT_RE = re.compile(r'nat\s+\([^)]+\)\s+(\d+\.\d+\.\d+\.\d+)\s+(\d+\.\d+\.\d+\.\d+)', re.IGNORECASE)
+_GLOBAL_RE = re.compile(r'global\s+\([^)]+\)\s+(\d+\.\d+\.\d+\.\d+)', re.IGNORECASE)
+
 
 class AsaDiscovery(VendorDiscoveryBase):
     """Cisco ASA firewall discovery implementation."""
@@ -90,7 +103,7 @@ class AsaDiscovery(VendorDiscoveryBase):
     def _parse_asa_route_line(self, line: str) -> Optional[RouteEntry]:
         """Parse ASA route output."""
         line = line.strip()
-        if not line or line.startswith("Gateway of last resort") or line.startswith("Codes:"):
+        if not line or line.startswith(("Gateway of last resort", "Codes:")):
             return None
         
         # ASA route formats:
@@ -176,15 +189,13 @@ class AsaDiscovery(VendorDiscoveryBase):
         networks = []
         
         # Match ACL entries in crypto maps
-        acl_pattern = r'access-list\s+(\d+)\s+permit\s+ip\s+(\d+\.\d+\.\d+\.\d+)\s+(\d+\.\d+\.\d+\.\d+)'
-        for match in re.finditer(acl_pattern, output, re.IGNORECASE):
+        for match in _ACL_RE.finditer(output):
             network = match.group(2)
             if self._is_valid_ip(network):
                 networks.append(network)
         
         # Match network-object statements
-        network_obj_pattern = r'network-object\s+host\s+(\d+\.\d+\.\d+\.\d+)'
-        for match in re.finditer(network_obj_pattern, output, re.IGNORECASE):
+        for match in _NETWORK_OBJ_RE.finditer(output):
             network = match.group(1)
             if self._is_valid_ip(network):
                 networks.append(network)
@@ -196,15 +207,13 @@ class AsaDiscovery(VendorDiscoveryBase):
         networks = []
         
         # Match nat statements
-        nat_pattern = r'nat\s+\([^)]+\)\s+(\d+\.\d+\.\d+\.\d+)\s+(\d+\.\d+\.\d+\.\d+)'
-        for match in re.finditer(nat_pattern, output, re.IGNORECASE):
+        for match in _NAT_RE.finditer(output):
             network = match.group(1)
             if self._is_valid_ip(network):
                 networks.append(network)
         
         # Match global statements
-        global_pattern = r'global\s+\([^)]+\)\s+(\d+\.\d+\.\d+\.\d+)'
-        for match in re.finditer(global_pattern, output, re.IGNORECASE):
+        for match in _GLOBAL_RE.finditer(output):
             network = match.group(1)
             if self._is_valid_ip(network):
                 networks.append(network)
@@ -256,15 +265,8 @@ class AsaDiscovery(VendorDiscoveryBase):
     
     def _extract_model_from_description(self, description: str) -> Optional[str]:
         """Extract ASA model from description."""
-        # ASA model patterns
-        model_patterns = [
-            r'ASA(\d+)',                       # ASA5506, ASA5515, etc.
-            r'FirePower\s+(\d+)',              # FirePower 1000 series
-            r'Adaptive\s+Security\s+Appliance',
-        ]
-        
-        for pattern in model_patterns:
-            match = re.search(pattern, description, re.IGNORECASE)
+        for pattern in _MODEL_PATTERNS:
+            match = pattern.search(description)
             if match:
                 return f"ASA {match.group(1)}" if match.groups() else "ASA"
         
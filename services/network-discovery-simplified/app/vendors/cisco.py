@@ -3,6 +3,8 @@ Cisco-specific discovery implementation.
 """
 
 import re
+import socket
+import struct
 import logging
 from typing import List, Dict, Optional, Any
 from .base import VendorDiscoveryBase
@@ -10,6 +12,18 @@ from ..types import SystemInfo, RouteEntry
 
 logger = logging.getLogger(__name__)
 
+# Common Cisco model patterns, compiled once
+_MODEL_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r'(\d+)(?:-[A-Z]+)?\s+router',  # 2900 router
+    r'(CISCO\s+\d+)(?:[A-Z]*)',     # CISCO2901
+    r'(ISR\s+\d+)',                  # ISR 4000
+    r'(ASR\s+\d+)',                  # ASR 1000
+    r'(Catalyst\s+\d+)',             # Catalyst switches
+    r'(Nexus\s+\d+)',                # Nexus switches
+    r'(ASA\d+)',                     # ASA firewalls
+    r'(FirePower\s+\d+)',            # Firepower
+))
+
 
 class CiscoDiscovery(VendorDiscoveryBase):
     """Cisco IOS/IOS-XE discovery implementation."""
@@ -100,7 +114,7 @@ class CiscoDiscovery(VendorDiscoveryBase):
     def _parse_cisco_route_line(self, line: str) -> Optional[RouteEntry]:
         """Parse a single Cisco route line."""
         line = line.strip()
-        if not line or line.startswith("Gateway of last resort") or line.startswith("Codes:"):
+        if not line or line.startswith(("Gateway of last resort", "Codes:")):
             return None
         
         # Expected formats:
@@ -216,20 +230,8 @@ class CiscoDiscovery(VendorDiscoveryBase):
     
     def _extract_model_from_description(self, description: str) -> Optional[str]:
         """Extract Cisco model from description."""
-        # Common Cisco model patterns
-        model_patterns = [
-            r'(\d+)(?:-[A-Z]+)?\s+router',  # 2900 router
-            r'(CISCO\s+\d+)(?:[A-Z]*)',     # CISCO2901
-            r'(ISR\s+\d+)',                  # ISR 4000
-            r'(ASR\s+\d+)',                  # ASR 1000
-            r'(Catalyst\s+\d+)',             # Catalyst switches
-            r'(Nexus\s+\d+)',                # Nexus switches
-            r'(ASA\d+)',                     # ASA firewalls
-            r'(FirePower\s+\d+)',            # Firepower
-        ]
-        
-        for pattern in model_patterns:
-            match = re.search(pattern, description, re.IGNORECASE)
+        for pattern in _MODEL_PATTERNS:
+            match = pattern.search(description)
             if match:
                 return match.group(1).strip()
         
@@ -259,13 +261,7 @@ class CiscoDiscovery(VendorDiscoveryBase):
             return "255.255.255.0"
         
         mask = (0xffffffff >> (32 - prefix)) << (32 - prefix)
-        netmask_parts = [
-            str((mask >> 24) & 0xff),
-            str((mask >> 16) & 0xff),
-            str((mask >> 8) & 0xff),
-            str(mask & 0xff)
-        ]
-        return '.'.join(netmask_parts)
+        return socket.inet_ntoa(struct.pack('!I', mask & 0xffffffff))
     
     def _classify_interface_type(self, interface: str) -> str:
         """Classify interface type from name."""
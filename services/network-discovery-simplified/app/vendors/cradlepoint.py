@@ -3,6 +3,8 @@ Cradlepoint-specific discovery implementation.
 """
 
 import re
+import socket
+import struct
 import logging
 from typing import List, Dict, Optional, Any
 from .base import VendorDiscoveryBase
@@ -10,6 +12,15 @@ from ..types import SystemInfo, RouteEntry
 
 logger = logging.getLogger(__name__)
 
+# Cradlepoint model patterns, compiled once
+_MODEL_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r'(cor\s+\w+)',                     # COR series (e.g., COR IBR1100)
+    r'(ibr\d+\w*)',                     # IBR series (e.g., IBR1700)
+    r'(arc\s+\w+)',                     # ARC series
+    r'(cba\d+\w*)',                     # CBA series
+    r'(ergos)',                         # ERGOS operating system
+))
+
 
 class CradlepointDiscovery(VendorDiscoveryBase):
     """Cradlepoint/ERG router discovery implementation."""
@@ -89,7 +100,7 @@ class CradlepointDiscovery(VendorDiscoveryBase):
     def _parse_cradlepoint_route_line(self, line: str) -> Optional[RouteEntry]:
         """Parse a single Cradlepoint route line."""
         line = line.strip()
-        if not line or line.startswith("Destination") or line.startswith("---"):
+        if not line or line.startswith(("Destination", "---")):
             return None
         
         # Cradlepoint route formats vary, try to match common patterns
@@ -197,17 +208,8 @@ class CradlepointDiscovery(VendorDiscoveryBase):
     
     def _extract_model_from_description(self, description: str) -> Optional[str]:
         """Extract Cradlepoint model from description."""
-        # Cradlepoint model patterns
-        model_patterns = [
-            r'(cor\s+\w+)',                     # COR series (e.g., COR IBR1100)
-            r'(ibr\d+\w*)',                     # IBR series (e.g., IBR1700)
-            r'(arc\s+\w+)',                     # ARC series
-            r'(cba\d+\w*)',                     # CBA series
-            r'(ergos)',                         # ERGOS operating system
-        ]
-        
-        for pattern in model_patterns:
-            match = re.search(pattern, description, re.IGNORECASE)
+        for pattern in _MODEL_PATTERNS:
+            match = pattern.search(description)
             if match:
                 return match.group(1).upper()
         
@@ -237,10 +239,4 @@ class CradlepointDiscovery(VendorDiscoveryBase):
             return "255.255.255.0"
         
         mask = (0xffffffff >> (32 - prefix)) << (32 - prefix)
-        netmask_parts = [
-            str((mask >> 24) & 0xff),
-            str((mask >> 16) & 0xff),
-            str((mask >> 8) & 0xff),
-            str(mask & 0xff)
-        ]
-        return '.'.join(netmask_parts)
+        return socket.inet_ntoa(struct.pack('!I', mask & 0xffffffff))
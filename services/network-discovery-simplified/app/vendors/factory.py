@@ -3,6 +3,9 @@ Vendor discovery factory for managing vendor-specific implementations.
 """
 
 import logging
+import re
+import socket
+import struct
 from typing import List, Dict, Optional, Type
 from .base import VendorDiscoveryBase
 from .cisco import CiscoDiscovery
@@ -18,6 +21,8 @@ class VendorDiscoveryFactory:
     def __init__(self):
         self._vendors: List[VendorDiscoveryBase] = []
         self._vendor_map: Dict[str, VendorDiscoveryBase] = {}
+        self._pattern_re: Optional[re.Pattern] = None
+        self._pattern_vendors: Dict[str, int] = {}
         self._register_default_vendors()
     
     def _register_default_vendors(self):
@@ -32,19 +37,48 @@ class VendorDiscoveryFactory:
         
         # Sort by priority (higher priority first)
         self._vendors.sort(key=lambda v: v.get_priority(), reverse=True)
+        self._build_pattern_matcher()
         
         logger.info(f"Registered vendor: {vendor.vendor_name}")
     
+    def _build_pattern_matcher(self):
+        """Compile every vendor's supported patterns into a single regex.
+        
+        Each keyword maps to the best-ranked vendor with a pattern that is a
+        prefix of it. Alternatives are tried longest first, so the keyword
+        matched at a position already accounts for every shorter pattern that
+        starts there, and one scan of sysDescr finds all matching vendors.
+        """
+        patterns: Dict[str, int] = {}
+        for rank, vendor in enumerate(self._vendors):
+            for pattern in vendor.supported_patterns:
+                patterns.setdefault(pattern.lower(), rank)
+        
+        self._pattern_vendors = {
+            keyword: min(rank for pattern, rank in patterns.items() if keyword.startswith(pattern))
+            for keyword in patterns
+        }
+        alternation = '|'.join(re.escape(k) for k in sorted(patterns, key=len, reverse=True))
+        self._pattern_re = re.compile(f'(?=({alternation}))') if patterns else None
+    
     def identify_vendor(self, system_info: SystemInfo) -> Optional[VendorDiscoveryBase]:
         """Identify vendor from system information."""
-        if not system_info or not system_info.sys_descr:
+        if not system_info or not system_info.sys_descr or self._pattern_re is None:
             return None
         
-        # Try each vendor in priority order
-        for vendor in self._vendors:
-            if vendor.identify_vendor(system_info):
-                logger.info(f"Identified vendor: {vendor.vendor_name}")
-                return vendor
+        # Lowest rank wins, matching the old priority-ordered loop
+        best = None
+        for match in self._pattern_re.finditer(system_info.sys_descr.lower()):
+            rank = self._pattern_vendors[match.group(1)]
+            if best is None or rank < best:
+                best = rank
+                if best == 0:
+                    break
+        
+        if best is not None:
+            vendor = self._vendors[best]
+            logger.info(f"Identified vendor: {vendor.vendor_name}")
+            return vendor
         
         logger.warning(f"Unknown vendor for system: {system_info.sys_descr[:100]}...")
         return None
@@ -152,13 +186,7 @@ class VendorDiscoveryFactory:
             return "255.255.255.0"
         
         mask = (0xffffffff >> (32 - prefix)) << (32 - prefix)
-        netmask_parts = [
-            str((mask >> 24) & 0xff),
-            str((mask >> 16) & 0xff),
-            str((mask >> 8) & 0xff),
-            str(mask & 0xff)
-        ]
-        return '.'.join(netmask_parts)
+        return socket.inet_ntoa(struct.pack('!I', mask & 0xffffffff))
 
 
 # Global factory instance
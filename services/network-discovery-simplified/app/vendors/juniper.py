@@ -3,6 +3,8 @@ Juniper-specific discovery implementation.
 """
 
 import re
+import socket
+import struct
 import logging
 from typing import List, Dict, Optional, Any
 from .base import VendorDiscoveryBase
@@ -10,6 +12,21 @@ from ..types import SystemInfo, RouteEntry
 
 logger = logging.getLogger(__name__)
 
+# Juniper model patterns, compiled once
+_MODEL_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r'(mx\d+)',                        # MX series routers
+    r'(ex\d+)',                        # EX series switches
+    r'(qfx\d+)',                       # QFX series switches
+    r'(srx\d+)',                       # SRX series firewalls
+    r'(ptx\d+)',                       # PTX series routers
+    r'(acx\d+)',                       # ACX series routers
+    r'(vrr\d+)',                       # Virtual routers
+))
+
+# Prefix of 'display set' static route statements:
+# "set routing-options static route 10.0.0.0/8 next-hop 192.168.1.1"
+_STATIC_ROUTE_PREFIX = 'set routing-options static route '
+
 
 class JuniperDiscovery(VendorDiscoveryBase):
     """Juniper JunOS discovery implementation."""
@@ -89,7 +106,7 @@ class JuniperDiscovery(VendorDiscoveryBase):
     def _parse_juniper_route_line(self, line: str) -> Optional[RouteEntry]:
         """Parse a single Juniper route line."""
         line = line.strip()
-        if not line or line.startswith("inet.") or line.startswith("mpls."):
+        if not line or line.startswith(("inet.", "mpls.")):
             return None
         
         # JunOS route formats:
@@ -157,13 +174,19 @@ class JuniperDiscovery(VendorDiscoveryBase):
         """Parse static routes from JunOS configuration."""
         routes = []
         
-        # Match set routing-options static route commands
-        route_pattern = r'set routing-options static route (\d+\.\d+\.\d+\.\d+)/(\d+) next-hop (\d+\.\d+\.\d+\.\d+)'
-        for match in re.finditer(route_pattern, output):
-            destination = match.group(1)
-            prefix = int(match.group(2))
-            next_hop = match.group(3)
-            netmask = self._cidr_to_netmask(prefix)
+        # 'display set' lines have a fixed token layout, so split them rather than regex scan
+        for line in output.splitlines():
+            _, found, statement = line.partition(_STATIC_ROUTE_PREFIX)
+            if not found:
+                continue
+            parts = statement.split()
+            if len(parts) < 3 or parts[1] != 'next-hop':
+                continue
+            destination, _, prefix = parts[0].partition('/')
+            next_hop = parts[2]
+            if not prefix.isdigit() or not self._is_valid_ip(destination) or not self._is_valid_ip(next_hop):
+                continue
+            netmask = self._cidr_to_netmask(int(prefix))
             
             routes.append(RouteEntry(
                 destination=destination,
@@ -238,19 +261,8 @@ class JuniperDiscovery(VendorDiscoveryBase):
     
     def _extract_model_from_description(self, description: str) -> Optional[str]:
         """Extract Juniper model from description."""
-        # Juniper model patterns
-        model_patterns = [
-            r'(mx\d+)',                        # MX series routers
-            r'(ex\d+)',                        # EX series switches
-            r'(qfx\d+)',                       # QFX series switches
-            r'(srx\d+)',                       # SRX series firewalls
-            r'(ptx\d+)',                       # PTX series routers
-            r'(acx\d+)',                       # ACX series routers
-            r'(vrr\d+)',                       # Virtual routers
-        ]
-        
-        for pattern in model_patterns:
-            match = re.search(pattern, description, re.IGNORECASE)
+        for pattern in _MODEL_PATTERNS:
+            match = pattern.search(description)
             if match:
                 return match.group(1).upper()
         
@@ -280,10 +292,4 @@ class JuniperDiscovery(VendorDiscoveryBase):
             return "255.255.255.0"
         
         mask = (0xffffffff >> (32 - prefix)) << (32 - prefix)
-        netmask_parts = [
-            str((mask >> 24) & 0xff),
-            str((mask >> 16) & 0xff),
-            str((mask >> 8) & 0xff),
-            str(mask & 0xff)
-        ]
-        return '.'.join(netmask_parts)
+        return socket.inet_ntoa(struct.pack('!I', mask & 0xffffffff))
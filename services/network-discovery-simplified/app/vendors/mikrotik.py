@@ -3,6 +3,8 @@ Mikrotik-specific discovery implementation.
 """
 
 import re
+import socket
+import struct
 import logging
 from typing import List, Dict, Optional, Any
 from .base import VendorDiscoveryBase
@@ -10,6 +12,21 @@ from ..types import SystemInfo, RouteEntry
 
 logger = logging.getLogger(__name__)
 
+# Mikrotik model patterns, compiled once
+_MODEL_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r'(rb\d+\w*)',                      # RouterBoard models (RB750, RB2011, etc.)
+    r'(crs\d+\w*)',                     # Cloud Router Switch series
+    r'(ccr\d+\w*)',                     # Cloud Core Router series
+    r'(hEX\s+\w*)',                     # hEX series
+    r'(hAP\s+\w*)',                     # hAP series
+    r'(wAP\s+\w*)',                     # wAP series
+    r'(mAP\s+\w*)',                     # mAP series
+    r'(cAP\s+\w*)',                     # cAP series
+    r'(LDF\s+\w*)',                     # LDF series
+    r'(RBD\s+\w*)',                     # RBD series (Diskless)
+    r'(RBM\d+\w*)',                     # RBM series (Mikrotik OS)
+))
+
 
 class MikrotikDiscovery(VendorDiscoveryBase):
     """Mikrotik RouterOS discovery implementation."""
@@ -87,7 +104,7 @@ class MikrotikDiscovery(VendorDiscoveryBase):
     def _parse_mikrotik_route_line(self, line: str) -> Optional[RouteEntry]:
         """Parse a single Mikrotik route line."""
         line = line.strip()
-        if not line or line.startswith("Flags:") or line.startswith("DST-ADDRESS"):
+        if not line or line.startswith(("Flags:", "DST-ADDRESS")):
             return None
         
         # Mikrotik route formats:
@@ -201,23 +218,8 @@ class MikrotikDiscovery(VendorDiscoveryBase):
     
     def _extract_model_from_description(self, description: str) -> Optional[str]:
         """Extract Mikrotik model from description."""
-        # Mikrotik model patterns
-        model_patterns = [
-            r'(rb\d+\w*)',                      # RouterBoard models (RB750, RB2011, etc.)
-            r'(crs\d+\w*)',                     # Cloud Router Switch series
-            r'(ccr\d+\w*)',                     # Cloud Core Router series
-            r'(hEX\s+\w*)',                     # hEX series
-            r'(hAP\s+\w*)',                     # hAP series
-            r'(wAP\s+\w*)',                     # wAP series
-            r'(mAP\s+\w*)',                     # mAP series
-            r'(cAP\s+\w*)',                     # cAP series
-            r'(LDF\s+\w*)',                     # LDF series
-            r'(RBD\s+\w*)',                     # RBD series (Diskless)
-            r'(RBM\d+\w*)',                     # RBM series (Mikrotik OS)
-        ]
-        
-        for pattern in model_patterns:
-            match = re.search(pattern, description, re.IGNORECASE)
+        for pattern in _MODEL_PATTERNS:
+            match = pattern.search(description)
             if match:
                 return match.group(1).upper()
         
@@ -243,10 +245,4 @@ class MikrotikDiscovery(VendorDiscoveryBase):
             return "255.255.255.0"
         
         mask = (0xffffffff >> (32 - prefix)) << (32 - prefix)
-        netmask_parts = [
-            str((mask >> 24) & 0xff),
-            str((mask >> 16) & 0xff),
-            str((mask >> 8) & 0xff),
-            str(mask & 0xff)
-        ]
-        return '.'.join(netmask_parts)
+        return socket.inet_ntoa(struct.pack('!I', mask & 0xffffffff))
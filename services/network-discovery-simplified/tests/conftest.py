@@ -0,0 +1,7 @@
+import os
+import sys
+
+# app.database builds its engines at import time, so point it at an in-memory
+# SQLite database before any test imports it
+os.environ['DATABASE_URL'] = 'sqlite://'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
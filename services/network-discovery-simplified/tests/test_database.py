@@ -0,0 +1,25 @@
+import asyncio
+
+from sqlalchemy import select
+
+from app.database import SessionLocal, async_engine, get_async_db, init_db
+from app.models import DiscoveryRun
+
+
+def test_async_session_sees_in_memory_schema():
+    """Rows written through the sync engine are readable through get_async_db."""
+    init_db()
+    with SessionLocal() as db:
+        db.add(DiscoveryRun(root_ip='10.0.0.1', status='COMPLETED'))
+        db.commit()
+
+    async def read_root_ips():
+        sessions = get_async_db()
+        db = await anext(sessions)
+        try:
+            return (await db.execute(select(DiscoveryRun.root_ip))).scalars().all()
+        finally:
+            await sessions.aclose()
+            await async_engine.dispose()
+
+    assert asyncio.run(read_root_ips()) == ['10.0.0.1']
@@ -0,0 +1,23 @@
+from app.discovery import NetworkDiscovery
+from app.types import RouteEntry, SystemInfo
+
+DEFAULT_ROUTE = [RouteEntry(destination='0.0.0.0', netmask='0.0.0.0', next_hop='10.0.0.1')]
+
+
+def test_classify_router_follows_ip_forwarding():
+    """An agent's ipForwarding answer overrides the route and interface heuristics."""
+    discovery = NetworkDiscovery(db_session=None)
+
+    host = SystemInfo(sys_descr='Linux server', ip_forwarding=False)
+    assert discovery._classify_router(host, DEFAULT_ROUTE, [{}, {}, {}]) is False
+
+    router = SystemInfo(ip_forwarding=True)
+    assert discovery._classify_router(router, [], []) is True
+
+
+def test_classify_router_falls_back_without_ip_forwarding():
+    """Agents that don't report ipForwarding are classified by their routes."""
+    discovery = NetworkDiscovery(db_session=None)
+
+    assert discovery._classify_router(SystemInfo(), DEFAULT_ROUTE, []) is True
+    assert discovery._classify_router(None, [], []) is False